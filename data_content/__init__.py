@@ -6,12 +6,13 @@ Contains dictionaries of policy data, sector goals, gas information, and chart e
 
 from .policy_data import policy_data
 from .sector_goals import global_climate_policies
-from .gas_information import gas_explanations
+from .gas_information import gas_explanations, gas_details
 from .chart_explanations import chart_explanations
 
 __all__ = [
     'policy_data',
     'global_climate_policies', 
     'gas_explanations',
+    'gas_details',
     'chart_explanations'
 ]
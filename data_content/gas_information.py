@@ -32,3 +32,52 @@ gas_explanations = {
         "the **industrial processes** sector."
     ),
 }
+
+
+# Expandable details shown on the Emissions Trends page for each selected gas:
+# gas column -> (expander title, markdown body)
+gas_details = {
+    'CO\u2082 (kt)': (
+        "Carbon Dioxide (CO\u2082)",
+        "CO\u2082 is the most abundant human-emitted greenhouse gas. \n"
+        "It mainly comes from **fossil fuel combustion**, **deforestation**, and **Industrial Processes**.\n"
+        "While less potent per molecule than other gases, it stays in the atmosphere for **hundreds of years**.\n"
+        "\n"
+        "**Info**: CO\u2082 accounts for over **75% of global GHG emissions**."
+    ),
+    'CH\u2084 (kt)': (
+        " Methane (CH\u2084)",
+        "Methane is a **short-lived climate pollutant**  over **25 times stronger than CO\u2082** over 100 years.\n"
+        "It's mainly released by **livestock**, **landfills**, and **fossil fuel extraction**.\n"
+        "\n"
+        "Methane breaks down faster than CO\u2082 but has a **much greater global warming potential** in the short term."
+    ),
+    'N\u2082O (kt)': (
+        "Nitrous Oxide (N\u2082O)",
+        "N\u2082O has a **global warming potential ~300 times that of CO\u2082**.\n"
+        "It is mostly emitted from **agricultural activities**, especially **fertiliser use**, as well as **wastewater** and **industry**.\n"
+        "\n"
+        "It also contributes to the **depletion of the ozone layer**."
+    ),
+    'HFCs (kt)': (
+        " Hydrofluorocarbons (HFCs)",
+        "HFCs are synthetic gases used in **air conditioning**, **refrigeration**, and **aerosol propellants**.\n"
+        "Their warming potential ranges from **hundreds to thousands of times** stronger than CO\u2082.\n"
+        "\n"
+        "Many are being phased out under international agreements like the **Kigali Amendment**."
+    ),
+    'PFCs (kt)': (
+        " Perfluorocarbons (PFCs)",
+        "PFCs are emitted during **aluminium production** and **semiconductor manufacturing**.\n"
+        "They are extremely long-lived, lasting **up to 50,000 years**.\n"
+        "\n"
+        "Though emissions are low, their **climate impact is significant** per molecule."
+    ),
+    'SF\u2086 (kt)': (
+        " Sulphur Hexafluoride (SF\u2086)",
+        "SF\u2086 is mainly used as an **insulating gas** in electrical systems.\n"
+        "It is the **most potent greenhouse gas**, with a GWP more than **23,000 times greater than CO\u2082** over 100 years.\n"
+        "\n"
+        "Despite small quantities, its **impact is large** due to its strength and long atmospheric lifetime."
+    ),
+}
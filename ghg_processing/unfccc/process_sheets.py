@@ -1,10 +1,28 @@
 import os
 import glob
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from .header_detector import read_excel_with_detected_header, extract_year_from_filename
 from .process_hierarchy import process_hierarchical_data
 from .save_gases import save_gas_level_parquet
 
+def combine_parquet_files(parquet_files, combined_path):
+    """
+    Combine parquet files into one file at the Arrow level, without building pandas frames
+
+    Args:
+        parquet_files (list): Paths of the parquet files to combine
+        combined_path (str): Path where the combined parquet file will be saved
+
+    Returns:
+        pa.Table: The combined table
+    """
+    # Years can report different columns, so missing ones are filled with nulls
+    combined_table = pa.concat_tables([pq.read_table(f) for f in parquet_files], promote_options="permissive")
+    pq.write_table(combined_table, combined_path)
+    return combined_table
+
 def process_summary_sheet(sheet_name, folder_path, output_folder, save_csv=False):
     """
     Process a specific summary sheet from all Excel files in the folder
@@ -215,17 +233,18 @@ def process_summary_sheet(sheet_name, folder_path, output_folder, save_csv=False
     # This creates time series datasets for each organisational level
     for level in levels:
         level_path = os.path.join(country_output, level)
-        parquet_files = glob.glob(os.path.join(level_path, "*.parquet"))
+        combined_path = os.path.join(level_path, f"{country_name}_{level}_combined.parquet")
+        # Skip a combined file from an earlier run so it is neither re-added nor deleted below
+        parquet_files = [f for f in glob.glob(os.path.join(level_path, "*.parquet")) if f != combined_path]
         if parquet_files:
-            combined_df = pd.concat([pd.read_parquet(f) for f in parquet_files])
-            combined_path = os.path.join(level_path, f"{country_name}_{level}_combined.parquet")
-            combined_df.to_parquet(combined_path, index=False)
+            # One file per country and level, so the dashboard reads a single file per level
+            combined_table = combine_parquet_files(parquet_files, combined_path)
             
             # Save combined CSV too
             if save_csv:
                 csv_level_path = os.path.join(csv_country_output, level)
                 csv_combined_path = os.path.join(csv_level_path, f"{country_name}_{level}_combined.csv")
-                combined_df.to_csv(csv_combined_path, index=False)
+                combined_table.to_pandas().to_csv(csv_combined_path, index=False)
 
             #  Remove individual year files 
             # (optional - if user wants to keep remove these two lines below)
@@ -241,9 +260,8 @@ def process_summary_sheet(sheet_name, folder_path, output_folder, save_csv=False
             parquet_files = glob.glob(os.path.join(level_path, f"*_{gas_type}.parquet"))
             
             if parquet_files:
-                combined_df = pd.concat([pd.read_parquet(f) for f in parquet_files])
                 combined_path = os.path.join(level_path, f"{country_name}_{level}_{gas_type}_combined.parquet")
-                combined_df.to_parquet(combined_path, index=False)
+                combined_df = combine_parquet_files(parquet_files, combined_path).to_pandas()
                 
                 # Save combined CSV too. If true
                 if save_csv:
@@ -15,16 +15,24 @@ from .data_loader import (
     load_geojson,
     load_all_total_emissions,
     get_country_folders,
-    preload_all_data
+    preload_all_data,
+    get_co2_column,
+    get_other_gas_columns,
+    get_gas_column_map,
+    get_column_roles,
+    ColumnRoles
 )
 
 from .utils import (
     get_ghg_map_sidebar,
     get_country_sidebar,
     get_sector_sidebar,
-    get_co2_column,
-    get_other_gas_columns,
-    create_complete_map_figure
+    create_complete_map_figure,
+    get_yearly_country_totals,
+    get_year_country_matrix,
+    get_px,
+    write_csv_bytes,
+    to_csv_bytes
 )
 
 __all__ = [
@@ -41,5 +49,13 @@ __all__ = [
     'get_sector_sidebar',
     'get_co2_column',
     'get_other_gas_columns',
-    'create_complete_map_figure'
+    'get_gas_column_map',
+    'get_column_roles',
+    'ColumnRoles',
+    'create_complete_map_figure',
+    'get_yearly_country_totals',
+    'get_year_country_matrix',
+    'get_px',
+    'write_csv_bytes',
+    'to_csv_bytes'
 ]
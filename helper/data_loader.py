@@ -4,124 +4,380 @@ Contains all data loading and caching functionality.
 """
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
 import os
 import glob
 import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 
-@st.cache_data(max_entries=50) 
-def load_country_data(country_code):
-    """Load data for a specific country with hierarchy levels"""
-    country_path = f"data/processed_data/{country_code}"
-    data_dict = {
-        'Total': None,
-        'Sectors': None,
-        'Subsectors': None,
-        'Sub-subsectors': None
+# Root folder of the processed UNFCCC data (one sub-folder per country)
+DATA_ROOT = "data/processed_data"
+
+# Hierarchy levels used by the dashboard and the folder each is saved in
+LEVEL_FOLDERS = {
+    'Total': 'total',
+    'Sectors': 'sectors',
+    'Subsectors': 'subsectors',
+    'Sub-subsectors': 'sub_subsectors'
+}
+
+# Levels needed by pages that only show country totals
+TOTAL_LEVEL = ('Total',)
+
+
+# Substring identifying each gas's column in the processed emissions data
+GAS_COLUMN_TOKENS = {
+    'CO2': 'CO₂',
+    'CH4': 'CH₄',
+    'N2O': 'N₂O',
+    'SF6': 'SF₆',
+    'HFC': 'HFCs',
+    'PFC': 'PFCs'
+}
+
+# Tokens of the non-CO2 gases, in the order their columns are reported
+OTHER_GAS_TOKENS = tuple(token for gas, token in GAS_COLUMN_TOKENS.items() if gas != 'CO2')
+
+# Column name of each gas in an emissions dataframe (None if not reported),
+# plus all non-CO2 gas columns in column order
+ColumnRoles = namedtuple('ColumnRoles', ['co2', 'ch4', 'n2o', 'sf6', 'hfc', 'pfc', 'all_other'])
+
+
+# Gas column helper functions
+def get_co2_column(df):
+    """Get the CO2 column name from dataframe"""
+    return next((col for col in df.columns if GAS_COLUMN_TOKENS['CO2'] in col), None)
+
+
+def get_other_gas_columns(df):
+    """Get non-CO2 gas columns from dataframe"""
+    return [col for col in df.columns if any(token in col for token in OTHER_GAS_TOKENS)]
+
+
+def get_gas_column_map(df):
+    """Map each gas key (e.g. 'CO2') to its column name in the dataframe, or None"""
+    if df is None:
+        return {gas: None for gas in GAS_COLUMN_TOKENS}
+    return {
+        gas: next((col for col in df.columns if token in col), None)
+        for gas, token in GAS_COLUMN_TOKENS.items()
     }
+
+
+def get_column_roles(df):
+    """Detect the role of every gas column once, for pages to read by attribute"""
+    gas_map = get_gas_column_map(df)
+    return ColumnRoles(
+        co2=gas_map['CO2'],
+        ch4=gas_map['CH4'],
+        n2o=gas_map['N2O'],
+        sf6=gas_map['SF6'],
+        hfc=gas_map['HFC'],
+        pfc=gas_map['PFC'],
+        all_other=get_other_gas_columns(df) if df is not None else []
+    )
+
+
+def downcast_integer_columns(df):
+    """Store integer columns in the smallest integer type that holds their values (lossless)"""
+    int_columns = df.select_dtypes('integer').columns
+    if len(int_columns):
+        df[int_columns] = df[int_columns].apply(pd.to_numeric, downcast='integer')
+    return df
+
+
+def get_year_bounds(df):
+    """Get the (first, last) year in a dataframe, or None if there is no data"""
+    if df is None or df.empty:
+        return None
+    return int(df['Year'].min()), int(df['Year'].max())
+
+
+def _get_level_files(folder):
+    """(country folder, parquet file) pairs of one hierarchy level, in country order"""
+    return [
+        (country_folder, file)
+        for country_folder in get_country_folders()
+        for file in sorted(glob.glob(os.path.join(DATA_ROOT, country_folder, folder, "*.parquet")))
+    ]
+
+
+@st.cache_resource
+def load_all_levels_arrow():
+    """
+    Load every country's hierarchy levels into one shared Arrow table per level.
+
+    Returns:
+        dict: Level name -> pa.Table (or None) with a 'Country' column holding the country folder name
+    """
+    tables = {}
+    for level, folder in LEVEL_FOLDERS.items():
+        files = [file for _, file in _get_level_files(folder)]
+        if not files:
+            tables[level] = None
+            continue
+
+        # Countries report different gases, so schemas are merged and missing columns read as nulls
+        schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+
+        # One multi-threaded scan over every file of the level; the country
+        # folder is the first directory below DATA_ROOT
+        folder_field = pa.field('__country_folder', pa.string())
+        dataset = ds.dataset(
+            files,
+            format="parquet",
+            filesystem=pafs.LocalFileSystem(use_mmap=True),
+            schema=schema.append(folder_field),
+            partitioning=ds.partitioning(pa.schema([folder_field])),
+            partition_base_dir=DATA_ROOT
+        )
+        table = dataset.to_table()
+
+        # Keep track of country (overwrites the upper-case name from processing)
+        if 'Country' in table.column_names:
+            table = table.drop_columns(['Country'])
+        table = table.rename_columns([
+            'Country' if name == folder_field.name else name for name in table.column_names
+        ])
+
+        # Rows grouped by country (stable sort keeps each country's file order)
+        # so every country is one contiguous slice of the shared table
+        tables[level] = table.sort_by('Country')
+
+    return tables
+
+
+@st.cache_resource
+def get_country_level_columns():
+    """
+    Find the columns each country's own files report at each hierarchy level.
+
+    Returns:
+        dict: Level name -> {country folder: list of column names in file order}
+    """
+    level_columns = {}
+    for level, folder in LEVEL_FOLDERS.items():
+        country_columns = {}
+        for country_folder, file in _get_level_files(folder):
+            columns = country_columns.setdefault(country_folder, [])
+            columns.extend(name for name in pq.read_schema(file).names if name not in columns)
+        level_columns[level] = country_columns
+    return level_columns
+
+
+def _get_row_ranges(countries):
+    """Map each country to its (first row, row count) in a country-sorted column"""
+    countries, starts, counts = np.unique(countries, return_index=True, return_counts=True)
+    return {
+        country: (int(start), int(count))
+        for country, start, count in zip(countries, starts, counts)
+    }
+
+
+@st.cache_resource
+def get_country_row_ranges():
+    """
+    Locate each country's rows in the shared level tables.
+
+    Returns:
+        dict: Level name -> {country folder: (first row, row count)}
+    """
+    row_ranges = {}
+    for level, table in load_all_levels_arrow().items():
+        if table is None:
+            row_ranges[level] = {}
+            continue
+        row_ranges[level] = _get_row_ranges(table['Country'].to_numpy())
+    return row_ranges
+
+
+@st.cache_data(max_entries=50) 
+def load_country_data(country_code, levels=tuple(LEVEL_FOLDERS)):
+    """Load data for a specific country with hierarchy levels
+
+    Args:
+        country_code (str): Country folder name
+        levels (tuple): Hierarchy levels to load, the others are left as None
+
+    Returns:
+        dict: Level name -> pd.DataFrame (or None), plus the cached gas columns and year bounds
+    """
+    level_tables = load_all_levels_arrow()
+    row_ranges = get_country_row_ranges()
+    level_columns = get_country_level_columns()
+    data_dict = {level: None for level in LEVEL_FOLDERS}
     
-    for level in data_dict.keys():
-        level_path = os.path.join(country_path, level.lower())
-        if os.path.exists(level_path):
-            files = glob.glob(os.path.join(level_path, "*.parquet"))
-            if files:
-                data_dict[level] = pd.concat([pd.read_parquet(f) for f in files])
+    for level in levels:
+        if country_code in row_ranges[level]:
+            # Zero-copy slice of the shared table instead of a filter over every country
+            start, count = row_ranges[level][country_code]
+            country_table = level_tables[level].slice(start, count)
+            # Drop gas columns that only exist for other countries (the merged schema adds
+            # them as nulls); columns the country reports are kept even if they are empty,
+            # in the file's order (Country back in its place, not appended by the scan)
+            own_columns = [name for name in level_columns[level][country_code] if name in country_table.column_names]
+            if 'Country' not in own_columns:
+                own_columns.append('Country')
+            country_table = country_table.select(own_columns)
+            level_df = country_table.to_pandas(types_mapper=pd.ArrowDtype)
+            level_df = downcast_integer_columns(level_df)
+
+            # Rows in year order (stable within a year), so a year range is one contiguous slice
+            if not level_df['Year'].is_monotonic_increasing:
+                level_df = level_df.sort_values('Year', kind='stable', ignore_index=True)
+
+            # Few distinct country/sector names, filtered and grouped on every rerun
+            for column in ['Country', 'GREENHOUSE GAS SOURCE AND SINK CATEGORIES']:
+                if column in level_df.columns:
+                    level_df[column] = level_df[column].astype('category')
+            data_dict[level] = level_df
+
+    # Detect gas columns once so pages don't rescan the columns on every rerun
+    total_df = data_dict['Total']
+    column_roles = get_column_roles(total_df)
+    data_dict['column_roles'] = column_roles
+    data_dict['co2_column'] = column_roles.co2
+    data_dict['other_gas_columns'] = column_roles.all_other
+    data_dict['year_bounds'] = get_year_bounds(total_df)
+    if total_df is not None:
+        total_df.attrs['co2_column'] = data_dict['co2_column']
     
     return data_dict
 
 
-@st.cache_data
+@st.cache_resource(show_spinner=False)
 def load_weather_data():
-    """Load extreme weather events data"""
-    try:
-        weather_data = pd.read_parquet('data/climate/processed_/summary_extreme_weather_all_countries.parquet')
-        return weather_data
-    except:
+    """Load extreme weather events data (read-only, shared by all sessions)"""
+    path = 'data/climate/processed_/summary_extreme_weather_all_countries.parquet'
+    if not os.path.exists(path):
         return None
+    weather_data = pd.read_parquet(path, memory_map=True)
 
+    # Rows grouped by country (stable sort keeps each country's file order),
+    # so a country's events are one contiguous slice
+    weather_data = weather_data.sort_values('Country', kind='stable', ignore_index=True)
 
-@st.cache_data
+    # Low-cardinality labels used for filtering and grouping
+    for column in ['Country', 'Disaster Type']:
+        weather_data[column] = weather_data[column].astype('category')
+
+    # Other text columns on Arrow-backed strings instead of Python objects
+    for column in weather_data.select_dtypes('object').columns:
+        if pd.api.types.infer_dtype(weather_data[column], skipna=True) == 'string':
+            weather_data[column] = weather_data[column].astype('string[pyarrow]')
+    return downcast_integer_columns(weather_data)
+
+
+@st.cache_resource(show_spinner=False)
+def get_weather_row_ranges():
+    """
+    Locate each country's rows in the weather events data.
+
+    Returns:
+        dict: Country -> (first row, row count), empty if there is no weather data
+    """
+    weather_data = load_weather_data()
+    if weather_data is None:
+        return {}
+    return _get_row_ranges(weather_data['Country'].astype(str).to_numpy())
+
+
+@st.cache_resource(show_spinner=False)
 def load_temperature_data():
-    """Load global temperature anomaly data"""
-    try:
-        temp_data = pd.read_parquet('data/climate/processed_/global_temp_anomalies.parquet')
-        return temp_data
-    except:
-        return None   
+    """Load global temperature anomaly data (read-only, shared by all sessions)"""
+    path = 'data/climate/processed_/global_temp_anomalies.parquet'
+    if not os.path.exists(path):
+        return None
+    temp_data = downcast_integer_columns(pd.read_parquet(path, memory_map=True))
 
+    # Parsed once here; years without a numeric anomaly (missing/placeholder values) are dropped
+    temp_data['Temperature_Anomaly'] = pd.to_numeric(temp_data['Temperature_Anomaly'], errors='coerce')
+    temp_data = temp_data.dropna(subset=['Temperature_Anomaly'])
 
+    # Sorted Year index so a year range is a label slice (binary search), not a full scan
+    return temp_data.sort_values('Year').set_index('Year', drop=False)
+
+
+@st.cache_resource(show_spinner=False)
 def load_global_emission():
-    """Load global emissions data"""
-    try:
-        global_emissions = pd.read_parquet("data/climate/processed_/global_emissions.parquet")
-        return global_emissions
-    except:
+    """Load global emissions data (read-only, shared by all sessions)"""
+    path = "data/climate/processed_/global_emissions.parquet"
+    if not os.path.exists(path):
         return None
+    emissions_data = downcast_integer_columns(pd.read_parquet(path, memory_map=True))
 
+    # Sorted Year index so the temperature data joins on the index instead of a hash merge
+    return emissions_data.sort_values('Year').set_index('Year', drop=False)
 
+
+@st.cache_resource(show_spinner=False)
 def load_geojson():
-    """Load the GeoJSON data for world countries"""
-    try:
-        with open('data/countries.geo.json') as f:
-            geojson = json.load(f)
-        return geojson
-    except:
+    """Load the GeoJSON data for world countries (parsed once, shared by all sessions)"""
+    path = 'data/countries.geo.json'
+    if not os.path.exists(path):
         return None
+    with open(path, 'rb') as f:
+        return json.loads(f.read())
 
 
 @st.cache_data
 def load_all_total_emissions():
     """Load all countries' total emissions data"""
-    all_country_folders = [
-        name for name in os.listdir("data/processed_data")
-        if os.path.isdir(os.path.join("data/processed_data", name))
-    ]
-    
-    all_data = []
-    for country_folder in all_country_folders:
-        country_path = f"data/processed_data/{country_folder}/total"
-        if os.path.exists(country_path):
-            files = glob.glob(os.path.join(country_path, "*.parquet"))
-            for f in files:
-                df = pd.read_parquet(f)
-                df = df[df['Year'] >= 1990]  
-                df["Country"] = country_folder  # Keep track of country
-                all_data.append(df)
-
-    if all_data:
-        return pd.concat(all_data, ignore_index=True)
-    else:
+    # Shares the Arrow buffers already loaded for the per-country pages
+    total_table = load_all_levels_arrow()['Total']
+    if total_table is None:
         return None
 
+    all_emissions = total_table.filter(pc.field('Year') >= 1990).to_pandas(types_mapper=pd.ArrowDtype)
+
+    # Small fixed set of countries/years: group on integer codes, not strings
+    all_emissions['Country'] = all_emissions['Country'].astype('category')
+    all_emissions['Year'] = all_emissions['Year'].astype('int16[pyarrow]')
+
+    # Detected once here instead of scanning the column names on every rerun
+    all_emissions.attrs['co2_column'] = get_co2_column(all_emissions)
+    return all_emissions
+
 
 def get_country_folders():
     """Get list of available country folders"""
-    data_root = "data/processed_data"
-    country_folders = sorted([
-        name for name in os.listdir(data_root)
-        if os.path.isdir(os.path.join(data_root, name))
-    ])
+    # DirEntry.is_dir() uses the type from the directory read, so no stat per entry
+    with os.scandir(DATA_ROOT) as entries:
+        country_folders = sorted(entry.name for entry in entries if entry.is_dir())
     return country_folders
 
 
 @st.cache_data
 def preload_all_data():
-    """Pre-load all data to trigger caching at startup"""
+    """Pre-load the global datasets at startup (countries are loaded when first selected)"""
     data = {}
     
-    # Get country labels
-    country_labels = get_country_folders()
-    
-    # Load global datasets
-    data['all_emissions'] = load_all_total_emissions()
-    data['weather'] = load_weather_data()
-    data['temperature'] = load_temperature_data()
-    data['global_emissions'] = load_global_emission()
-    data['geojson'] = load_geojson()
-    
-    # Pre-load data for all countries
-    for country in country_labels:
-        data[f'country_{country}'] = load_country_data(country)
+    # Loads overlap in worker threads (Arrow/parquet release the GIL); each
+    # worker gets the script context so the cached loaders behave as usual
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+        # Climate files are independent of the emissions tables
+        weather = executor.submit(load_weather_data)
+        temperature = executor.submit(load_temperature_data)
+        global_emissions = executor.submit(load_global_emission)
+        geojson = executor.submit(load_geojson)
+
+        # Load global datasets
+        data['all_emissions'] = load_all_total_emissions()
+        data['all_emissions_year_bounds'] = get_year_bounds(data['all_emissions'])
+
+        data['weather'] = weather.result()
+        data['temperature'] = temperature.result()
+        data['global_emissions'] = global_emissions.result()
+        data['geojson'] = geojson.result()
     
     return data
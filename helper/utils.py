@@ -3,38 +3,66 @@ Utility functions for the GHG Emissions Dashboard.
 Contains sidebar functions and other utility functions.
 """
 
+import io
 import streamlit as st
 import plotly.graph_objects as go
 import numpy as np
-from helper.data_loader import get_country_folders
+import pyarrow as pa
+import pyarrow.compute as pc
+from helper.data_loader import (
+    LEVEL_FOLDERS, TOTAL_LEVEL, get_country_folders, load_country_data
+)
 
 
 def get_ghg_map_sidebar():
     """Sidebar for GHG Map page - only year range"""
     sidebar_data = {'year_range': None}
     
-    # Load all emissions data to get year range
-    all_emissions_df = st.session_state.preloaded_data['all_emissions']
-    if all_emissions_df is not None:
-        years = sorted(all_emissions_df['Year'].unique())
+    # Year bounds are computed once when the data is preloaded
+    year_bounds = st.session_state.preloaded_data['all_emissions_year_bounds']
+    if year_bounds is not None:
+        first_year, last_year = year_bounds
         sidebar_data['year_range'] = st.sidebar.slider(
             "Select Year Range",
-            min_value=min(years),
-            max_value=max(years),
-            value=(min(years), max(years)),
+            min_value=first_year,
+            max_value=last_year,
+            value=(first_year, last_year),
             key="ghg_map_year_range"
         )
     
     return sidebar_data
 
 
-def get_country_sidebar(page_key):
+def _get_country_data(country_code, levels=TOTAL_LEVEL):
+    """Data for one country, shared by every page's country sidebar"""
+    preloaded_data = st.session_state.preloaded_data
+
+    # Loaded on first selection and kept for the rest of the session
+    key = f'country_{country_code}'
+    if levels != TOTAL_LEVEL:
+        key = f"{key}_{'_'.join(levels)}"
+    if key not in preloaded_data:
+        preloaded_data[key] = load_country_data(country_code, levels=levels)
+    data_dict = preloaded_data[key]
+    return {
+        'data_dict': data_dict,
+        'total_emissions_df': data_dict['Total'],
+        'column_roles': data_dict['column_roles'],
+        'co2_column': data_dict['co2_column'],
+        'other_gas_columns': data_dict['other_gas_columns'],
+    }
+
+
+def get_country_sidebar(page_key, levels=TOTAL_LEVEL):
     """Generic sidebar for pages that need country + year range"""
     sidebar_data = {
         'selected_country_folder': None,
         'year_range': None,
         'data_dict': None,
         'total_emissions_df': None,
+        'column_roles': None,
+        'co2_column': None,
+        'other_gas_columns': [],
     }
 
     # Get country labels
@@ -50,17 +78,15 @@ def get_country_sidebar(page_key):
     sidebar_data['selected_country_folder'] = selected_label
 
     # Use pre-loaded data instead of loading fresh
-    sidebar_data['data_dict'] = st.session_state.preloaded_data[f'country_{selected_label}']
-    total_df = sidebar_data['data_dict']['Total']
-    sidebar_data['total_emissions_df'] = total_df
+    sidebar_data.update(_get_country_data(selected_label, levels))
 
-    # Year slider
-    years = sorted(total_df['Year'].unique())
+    # Year slider (bounds cached by the country loader)
+    first_year, last_year = sidebar_data['data_dict']['year_bounds']
     sidebar_data['year_range'] = st.sidebar.slider(
         "Select Year Range",
-        min_value=min(years),
-        max_value=max(years),
-        value=(min(years), max(years)),
+        min_value=first_year,
+        max_value=last_year,
+        value=(first_year, last_year),
         key=f"{page_key}_year_range"
     )
 
@@ -69,7 +95,7 @@ def get_country_sidebar(page_key):
 
 def get_sector_sidebar():
     """Sidebar for Sector Distribution page - country + year range + hierarchy"""
-    sidebar_data = get_country_sidebar("sector_distribution")
+    sidebar_data = get_country_sidebar("sector_distribution", levels=tuple(LEVEL_FOLDERS))
     
     # Add hierarchy level selector
     hierarchy_options = ['Sectors', 'Subsectors', 'Sub-subsectors']  
@@ -81,71 +107,139 @@ def get_sector_sidebar():
     # Add sector selection to sidebar
     sector_df = sidebar_data['data_dict'].get(sidebar_data['selected_hierarchy'])
     if sector_df is not None:
-        available_sectors = sector_df['GREENHOUSE GAS SOURCE AND SINK CATEGORIES'].unique()
-        sidebar_data['selected_sectors'] = st.sidebar.multiselect(
+        available_sectors = sector_df['GREENHOUSE GAS SOURCE AND SINK CATEGORIES'].unique().tolist()
+        sidebar_data['selected_sectors'] = frozenset(st.sidebar.multiselect(
             "Select Sectors",
             options=available_sectors,
             default=available_sectors,
             key="sector_selection"
-        )
+        ))
     else:
-        sidebar_data['selected_sectors'] = []
+        sidebar_data['selected_sectors'] = frozenset()
 
     return sidebar_data
 
 
-# Gas column helper functions
-def get_co2_column(df):
-    """Get the CO2 column name from dataframe"""
-    co2_columns = [col for col in df.columns if 'CO₂' in col]
-    return co2_columns[0] if co2_columns else None
+def get_px():
+    """Plotly Express, imported on first use
+
+    The map page only uses graph_objects, so the chart pages import Express
+    through here instead of every view loading it at app start.
+    """
+    import plotly.express as px
+    return px
 
 
-def get_other_gas_columns(df):
-    """Get non-CO2 gas columns from dataframe"""
-    return [col for col in df.columns if any(gas in col for gas in ['CH₄', 'N₂O', 'SF₆', 'HFCs', 'PFCs'])]
+def write_csv_bytes(df):
+    """Serialise a dataframe to CSV bytes for a download button (uncached)"""
+    # Written straight to a bytes buffer: no intermediate str to encode afterwards
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False, encoding='utf-8')
+    return buffer.getvalue()
+
+
+@st.cache_data(show_spinner=False)
+def to_csv_bytes(df):
+    """Serialise a dataframe to CSV bytes for a download button, cached on the dataframe contents"""
+    return write_csv_bytes(df)
+
+
+@st.cache_resource(show_spinner=False)
+def get_yearly_country_totals(_all_emissions_df, co2_column):
+    """Total CO2 per year and country, aggregated once for every year range
+
+    Returns:
+        pa.Table: 'Year', 'Country' and '<co2_column>_sum' columns, sorted by year
+    """
+    emissions_table = pa.Table.from_pandas(
+        _all_emissions_df[['Year', 'Country', co2_column]], preserve_index=False
+    )
 
+    # Aggregate every year x country pair in one Arrow hash-aggregate pass
+    # (min_count=0 keeps pandas semantics: all-missing groups sum to 0)
+    return emissions_table.group_by(['Year', 'Country']).aggregate(
+        [(co2_column, 'sum', pc.ScalarAggregateOptions(min_count=0))]
+    ).sort_by('Year')
 
-@st.cache_data(max_entries=50, ttl=3600)
-def create_complete_map_figure(all_emissions_df, year_range, geojson):
-    """Create and cache the complete map figure with frames"""
+
+@st.cache_resource(show_spinner=False)
+def get_year_country_matrix(_all_emissions_df, co2_column):
+    """Yearly country totals unstacked to a year x country matrix
+
+    Returns:
+        pd.DataFrame: One row per year, one float64 column per country (NaN where a country has no data)
+    """
+    yearly_totals = get_yearly_country_totals(_all_emissions_df, co2_column)
+    return yearly_totals.to_pandas().pivot(
+        index='Year', columns='Country', values=f"{co2_column}_sum"
+    ).astype('float64')
+
+
+@st.cache_resource(max_entries=50, ttl=3600)
+def create_complete_map_figure(_all_emissions_df, year_range, _geojson, co2_column):
+    """Create and cache the complete map figure with frames
+
+    The emissions table and GeoJSON are the same shared objects on every call,
+    so they are left out of the cache key (leading underscore) rather than
+    hashed on each rerun. The figure embeds the GeoJSON, so it is shared
+    rather than unpickled on every rerun; st.plotly_chart only reads it.
+    """
     frames = []
-    co2_column = get_co2_column(all_emissions_df)
     
     years = range(year_range[0], year_range[1] + 1)
+
+    # Totals are sorted by year, so the selected range is one contiguous slice
+    yearly_totals = get_yearly_country_totals(_all_emissions_df, co2_column)
+    total_years = yearly_totals['Year'].to_numpy()
+    first_row = np.searchsorted(total_years, year_range[0], side='left')
+    last_row = np.searchsorted(total_years, year_range[1], side='right')
+    yearly_totals = yearly_totals.slice(first_row, last_row - first_row)
+    total_column = f"{co2_column}_sum"
+
+    # One colour scale for the whole animation: the largest total in the range
+    zmax_global = pc.max(yearly_totals[total_column]).as_py()
+
+    # float32 is plenty for a colour scale and halves the z data sent to the browser
+    yearly_totals = yearly_totals.set_column(
+        yearly_totals.schema.get_field_index(total_column),
+        total_column,
+        pc.cast(yearly_totals[total_column], pa.float32())
+    )
     
-    # Create frames
-    for year in years:
-        year_data = all_emissions_df[all_emissions_df['Year'] == year]
-        if not year_data.empty:
-            emissions_df = year_data.groupby('Country')[co2_column].sum().reset_index()
-            
-            frame = go.Frame(
-                data=[go.Choropleth(
-                    locations=emissions_df['Country'],
-                    z=emissions_df[co2_column],
-                    geojson=geojson,
-                    featureidkey="properties.name",
-                    colorscale="YlOrRd",
-                    zmin=0,
-                    zmax=emissions_df[co2_column].max(),
-                    colorbar=dict(title="CO\u2082 Emissions (kt)"),
-                    hovertemplate="<b>%{location}</b><br>CO\u2082: %{z:,.0f} kt<extra></extra>"
-                )],
-                name=str(year)
-            )
-            frames.append(frame)
+    # Create frames: rows are sorted by year, so each year is one contiguous
+    # zero-copy slice instead of a filter over the whole table
+    frame_years, year_starts, year_counts = np.unique(
+        yearly_totals['Year'].to_numpy(), return_index=True, return_counts=True
+    )
+    for year, start, count in zip(frame_years, year_starts, year_counts):
+        year_data = yearly_totals.slice(start, count)
+        locations = year_data['Country'].to_numpy()
+        z_values = year_data[total_column].to_numpy()  # contiguous float32 ndarray
+        
+        # Frames only carry what changes per year; geojson, colorscale and
+        # hover text are inherited from the base trace (traces=[0]) so they are
+        # sent once. The Choropleth wrapper only adds the trace type: a bare
+        # dict would be validated as a scatter trace, which has no z.
+        frame = go.Frame(
+            data=[go.Choropleth(
+                locations=locations,
+                z=z_values
+            )],
+            traces=[0],
+            name=str(year)
+        )
+        frames.append(frame)
     
     # Create the complete figure
     fig = go.Figure()
     fig.add_trace(go.Choropleth(
         locations=frames[0].data[0].locations,
         z=frames[0].data[0].z,
-        geojson=geojson,
+        geojson=_geojson,
         featureidkey="properties.name",
         colorscale="YlOrRd",
         zmin=0,
-        zmax=max([frame.data[0].z.max() for frame in frames]),
+        zmax=zmax_global,
         colorbar=dict(
             title="CO\u2082 Emissions (kt)",
             thickness=15,
@@ -5,10 +5,229 @@ Shows the connection between emissions and climate impacts.
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-from helper.utils import get_co2_column
+from helper.data_loader import get_weather_row_ranges
+from helper.utils import get_px, to_csv_bytes
+
+
+# CO2 column of the global emissions dataset
+GLOBAL_CO2_COLUMN = 'CO\u2082'
+
+
+@st.cache_data(max_entries=50, show_spinner=False)
+def _get_country_weather(_weather_data, country, year_range):
+    """Extreme weather events for one country and year range
+
+    The full weather table is not hashed (leading underscore); it is the
+    same pre-loaded table every call, so country and year range are the key.
+    """
+    # Rows are grouped by country at load: take the country's slice instead of scanning every row
+    start, count = get_weather_row_ranges().get(country, (0, 0))
+    country_rows = _weather_data.iloc[start:start + count]
+    country_weather = country_rows[country_rows['Year'].between(year_range[0], year_range[1])].reset_index(drop=True)
+
+    # Drop other countries' disaster types so counts and legends only show this country's
+    country_weather['Disaster Type'] = country_weather['Disaster Type'].cat.remove_unused_categories()
+    return country_weather
+
+
+@st.cache_data(max_entries=50, show_spinner=False)
+def _get_country_weather_aggregates(_country_weather, country, year_range):
+    """Headline metrics and per-year/per-type summaries for one country and year range
+
+    Returns:
+        dict: 'total_events', 'total_deaths', 'total_affected', 'most_common_disaster',
+              'yearly_events', 'event_types', 'disaster_summary', 'yearly_summary' and 'event_trend_slope'
+    """
+    # One pass over the events; every per-year and per-type view below is a
+    # marginal of this small table (events without a type are kept for the yearly totals)
+    grouped = _country_weather.groupby(['Year', 'Disaster Type'], observed=True, dropna=False).agg(
+        events=('Year', 'size'),
+        deaths=('Total Deaths', 'sum'),
+        affected=('Total Affected', 'sum')
+    )
+
+    # Per-disaster-type totals, shared by the severity chart and the summary table
+    by_type = grouped.groupby(level='Disaster Type', observed=True).sum()
+    disaster_summary = pd.DataFrame({
+        'Total Deaths': by_type['deaths'],
+        'Total Affected': by_type['affected'],
+        'Event Count': by_type['events']
+    }).reset_index()
+
+    # Counts in descending order, ties kept in (alphabetical) category order like value_counts
+    event_types = by_type['events'].sort_values(ascending=False, kind='stable').rename('count')
+    most_common_disaster = event_types.index[0] if len(event_types) else 'N/A'
+
+    # Per-year totals for the yearly summary download; its 'Disaster Type' column
+    # counts only the events that have a type
+    by_year = grouped.groupby(level='Year').sum()
+    has_type = grouped.index.get_level_values('Disaster Type').notna()
+    typed_events = grouped['events'].where(has_type, 0).groupby(level='Year').sum()
+    yearly_summary = pd.DataFrame({
+        'Total Deaths': by_year['deaths'],
+        'Total Affected': by_year['affected'],
+        'Disaster Type': typed_events
+    }).reset_index()
+
+    # Only the event count per year is charted
+    yearly_events = by_year['events'].rename_axis('Year').reset_index(name='Number of Events')
+
+    # Linear trend of the yearly event count (None with fewer than two years):
+    # least-squares slope in closed form (no SVD for a straight line)
+    event_trend_slope = None
+    if len(yearly_events) > 1:
+        years = yearly_events['Year'].to_numpy(dtype='float64')
+        event_counts = yearly_events['Number of Events'].to_numpy(dtype='float64')
+        year_offsets = years - years.mean()
+        event_trend_slope = (year_offsets @ (event_counts - event_counts.mean())) / (year_offsets @ year_offsets)
+
+    return {
+        'total_events': len(_country_weather),
+        'total_deaths': by_year['deaths'].sum(),
+        'total_affected': by_year['affected'].sum(),
+        'most_common_disaster': most_common_disaster,
+        'yearly_events': yearly_events,
+        'event_types': event_types,
+        'disaster_summary': disaster_summary,
+        'yearly_summary': yearly_summary,
+        'event_trend_slope': event_trend_slope
+    }
+
+
+@st.cache_data(max_entries=50, show_spinner=False)
+def _build_global_frame(_filtered_temp_data, _emissions_data, year_range):
+    """Merge global temperature and CO2 by year and correlate them, once per year range
+
+    Global data does not depend on the country, so changing country reuses the result.
+
+    Returns:
+        tuple: (global_combined, correlation)
+    """
+    # Temperature years looked up in the sorted Year index of the emissions data
+    global_combined = _filtered_temp_data.join(
+        _emissions_data[[GLOBAL_CO2_COLUMN]],
+        on='Year',
+        how='inner'
+    ).reset_index(drop=True)
+
+    # Pairs with a missing value are skipped, as pandas does
+    temp = global_combined['Temperature_Anomaly'].to_numpy(dtype=np.float64, na_value=np.nan)
+    co2 = global_combined[GLOBAL_CO2_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~(np.isnan(temp) | np.isnan(co2))
+    if valid.sum() > 1:
+        correlation = float(np.corrcoef(temp[valid], co2[valid])[0, 1])
+    else:
+        correlation = float('nan')
+
+    return global_combined, correlation
+
+
+@st.cache_resource(max_entries=50, show_spinner=False)
+def _build_temperature_figure(_filtered_temp_data, year_range):
+    """Temperature anomaly line chart with the warming thresholds, built once per year range
+
+    Global temperatures do not depend on the country, so changing country or any
+    other widget reuses the same figure object.
+    """
+    px = get_px()
+
+    fig_temp = px.line(
+        _filtered_temp_data,
+        x='Year',
+        y='Temperature_Anomaly',
+        title=' Global Temperature Anomalies: The Climate Trend',
+        labels={'Temperature_Anomaly': 'Temperature Anomaly (°C)'}
+    )
+
+    # Add critical thresholds
+    fig_temp.add_hline(y=0, line_dash="dash", line_color="blue", 
+                    annotation_text="20th Century Average")
+    fig_temp.add_hline(y=1.5, line_dash="dot", line_color="orange", 
+                    annotation_text="Paris Agreement Target: +1.5°C")
+    fig_temp.add_hline(y=2.0, line_dash="dot", line_color="red", 
+                    annotation_text="Dangerous Warming: +2.0°C")
+
+    # Color the line based on temperature
+    fig_temp.update_traces(
+        line=dict(width=3),
+        marker=dict(size=6)
+    )
+
+    return fig_temp
+
+
+@st.cache_resource(max_entries=50, show_spinner=False)
+def _build_emissions_temperature_figures(_combined_years, _combined_temp, _combined_co2, year_range):
+    """Global emissions-temperature time series and correlation figures, built once per year range
+
+    Returns:
+        tuple: (fig_timeseries, fig_correlation)
+    """
+    # Time series with dual y-axis
+    fig_timeseries = go.Figure()
+
+    fig_timeseries.add_trace(go.Scatter(
+        x=_combined_years, 
+        y=_combined_temp, 
+        name='Temperature Anomaly', 
+        line=dict(color='red', width=3),
+        yaxis='y1'
+    ))
+
+    fig_timeseries.add_trace(go.Scatter(
+        x=_combined_years, 
+        y=_combined_co2, 
+        name='Global CO₂ Emissions', 
+        line=dict(color='blue', width=3),
+        yaxis='y2'
+    ))
+
+    fig_timeseries.update_layout(
+        title='Global Temperature and CO₂ Emissions Over Time',
+        yaxis=dict(title='Temperature Anomaly (°C)', side='left'),
+        yaxis2=dict(title='CO₂ Emissions (kt)', side='right', overlaying='y'),
+        template='plotly_white'
+    )
+
+    # Correlation scatter plot (WebGL markers, coloured by year)
+    fig_correlation = go.Figure()
+    fig_correlation.add_trace(go.Scattergl(
+        x=_combined_co2,
+        y=_combined_temp,
+        mode='markers',
+        name='Year',
+        showlegend=False,
+        customdata=_combined_years,
+        marker=dict(
+            color=_combined_years,
+            colorscale='Viridis',
+            showscale=True,
+            colorbar=dict(title='Year')
+        ),
+        hovertemplate="CO₂ Emissions (kt): %{x:,.0f}<br>" +
+                      "Temperature Anomaly (°C): %{y:.2f}<br>" +
+                      "Year: %{customdata}<extra></extra>"
+    ))
+
+    # Add trend line
+    fig_correlation.add_trace(go.Scatter(
+        x=_combined_co2,
+        y=_combined_temp,
+        mode='lines',
+        name='Trend',
+        line=dict(color='purple', width=2),
+        showlegend=True
+    ))
+
+    fig_correlation.update_layout(
+        title='The Relationship: Higher Emissions → Higher Temperatures',
+        xaxis_title='CO₂ Emissions (kt)',
+        yaxis_title='Temperature Anomaly (°C)'
+    )
+
+    return fig_timeseries, fig_correlation
 
 
 def render_climate_impact_page(sidebar_data):
@@ -17,7 +236,6 @@ def render_climate_impact_page(sidebar_data):
 
     Args:
         sidebar_data (dict): Dictionary containing:
-            - total_emissions_df (pd.DataFrame): Emissions data
             - year_range (tuple): Selected year range (start_year, end_year)
             - selected_country_folder (str): Currently selected country
 
@@ -25,10 +243,9 @@ def render_climate_impact_page(sidebar_data):
         None - Renders content directly to Streamlit page
     """
     # Extract required data from sidebar
-    total_emissions_df = sidebar_data['total_emissions_df']
     year_range = sidebar_data['year_range']
     selected_country_folder = sidebar_data['selected_country_folder']
-    co2_column = get_co2_column(total_emissions_df)
+    px = get_px()
     
     # Enhanced header
     st.markdown(f""" Climate Impact: The Real-World Impact!
@@ -51,33 +268,35 @@ def render_climate_impact_page(sidebar_data):
     temp_data = st.session_state.preloaded_data['temperature']
     emissions_data = st.session_state.preloaded_data['global_emissions']
     
-    if all(data is not None for data in [weather_data, temp_data, total_emissions_df]):
+    if all(data is not None for data in [weather_data, temp_data, emissions_data]):
         
         # Add a "Climate Story" introduction
         st.markdown("---")
         st.subheader("Effects so far")
         
         # Calculate some compelling statistics
-        filtered_temp_data = temp_data[temp_data['Year'].between(year_range[0], year_range[1])].copy()
-
-        # Fix data types - convert Temperature_Anomaly to numeric
-        filtered_temp_data['Temperature_Anomaly'] = pd.to_numeric(filtered_temp_data['Temperature_Anomaly'], errors='coerce')
-        filtered_temp_data = filtered_temp_data.dropna(subset=['Temperature_Anomaly'])
-
-        # Add metrics for top of page
-        try:
-            temp_change = filtered_temp_data['Temperature_Anomaly'].iloc[-1] - filtered_temp_data['Temperature_Anomaly'].iloc[0]
-            avg_temp = filtered_temp_data['Temperature_Anomaly'].mean()
-            latest_temp = filtered_temp_data['Temperature_Anomaly'].iloc[-1]
-        except Exception as e:
-            st.error(f"Error calculating temperature metrics: {str(e)}")
+        # Anomalies are already numeric (non-numeric years are dropped at load)
+        filtered_temp_data = temp_data.loc[year_range[0]:year_range[1]].reset_index(drop=True)
+
+        # Add metrics for top of page (rows are sorted by year, so first/last are the range ends)
+        temp_values = filtered_temp_data['Temperature_Anomaly'].to_numpy(dtype=np.float64)
+        if temp_values.size:
+            temp_change = temp_values[-1] - temp_values[0]
+            avg_temp = temp_values.mean()
+            latest_temp = temp_values[-1]
+        else:
+            st.error("Error calculating temperature metrics: no temperature data for the selected years")
             temp_change = 0
             avg_temp = 0
             latest_temp = 0
 
-        country_weather = weather_data[weather_data['Country'] == selected_country_folder]
-        total_events = len(country_weather)
-        total_affected = country_weather['Total Affected'].sum()
+        # Filter to the selected country and years before any aggregation or merge
+        country_weather = _get_country_weather(weather_data, selected_country_folder, year_range)
+        weather_aggregates = _get_country_weather_aggregates(country_weather, selected_country_folder, year_range)
+        total_events = weather_aggregates['total_events']
+        total_deaths = weather_aggregates['total_deaths']
+        total_affected = weather_aggregates['total_affected']
+        most_common_disaster = weather_aggregates['most_common_disaster']
         
         # Create an engaging story box
         st.info(f"""
@@ -106,11 +325,9 @@ def render_climate_impact_page(sidebar_data):
             st.metric("Total Temperature Rise", f"{temp_change:.2f}°C", 
                      delta=f"Since {year_range[0]}", delta_color="inverse")
         with col2:
-            avg_temp = filtered_temp_data['Temperature_Anomaly'].mean()
             st.metric("Average Anomaly", f"{avg_temp:.2f}°C", 
                      help="Average temperature above 20th century baseline")
         with col3:
-            latest_temp = filtered_temp_data['Temperature_Anomaly'].iloc[-1]
             st.metric("Latest Anomaly", f"{latest_temp:.2f}°C", 
                      help=f"Temperature anomaly in {year_range[1]}")
         with col4:
@@ -129,34 +346,12 @@ def render_climate_impact_page(sidebar_data):
         # Enhanced temperature visualisation
         temp_chart_tab, temp_table_tab = st.tabs(['Chart', 'Table'])
         with temp_chart_tab: 
-            fig_temp = px.line(
-                filtered_temp_data,
-                x='Year',
-                y='Temperature_Anomaly',
-                title=' Global Temperature Anomalies: The Climate Trend',
-                labels={'Temperature_Anomaly': 'Temperature Anomaly (°C)'}
-            )
-           
-
-            # Add critical thresholds
-            fig_temp.add_hline(y=0, line_dash="dash", line_color="blue", 
-                            annotation_text="20th Century Average")
-            fig_temp.add_hline(y=1.5, line_dash="dot", line_color="orange", 
-                            annotation_text="Paris Agreement Target: +1.5°C")
-            fig_temp.add_hline(y=2.0, line_dash="dot", line_color="red", 
-                            annotation_text="Dangerous Warming: +2.0°C")
-            
-            # Color the line based on temperature
-            fig_temp.update_traces(
-                line=dict(width=3),
-                marker=dict(size=6)
-            )
-            
+            fig_temp = _build_temperature_figure(filtered_temp_data, year_range)
             st.plotly_chart(fig_temp, use_container_width=True)
         
         with temp_table_tab:
             st.dataframe(filtered_temp_data)
-            csv = filtered_temp_data.to_csv(index=False)
+            csv = to_csv_bytes(filtered_temp_data)
             st.download_button(
                 label="Download temperature data as CSV",
                 data=csv,
@@ -182,73 +377,30 @@ def render_climate_impact_page(sidebar_data):
         The relationship isn't always linear year-to-year due to natural variability, but the long-term trend is unmistakable.
         """)
         
-        # Create combined global dataset
-        global_combined = pd.merge(
-            filtered_temp_data,
-            emissions_data[['Year', 'CO\u2082']],
-            on='Year',
-            how='inner'
-        )
+        # Combined global dataset and its correlation (cached per year range, shared by every chart below)
+        global_combined, correlation = _build_global_frame(filtered_temp_data, emissions_data, year_range)
         
+        # Plain float32 arrays keep the chart JSON small (plenty of precision for plotting)
+        combined_years = global_combined['Year'].to_numpy()
+        combined_temp = global_combined['Temperature_Anomaly'].to_numpy(dtype=np.float32, na_value=np.nan)
+        combined_co2 = global_combined[GLOBAL_CO2_COLUMN].to_numpy(dtype=np.float32, na_value=np.nan)
+
+        fig_timeseries, fig_correlation = _build_emissions_temperature_figures(
+            combined_years, combined_temp, combined_co2, year_range
+        )
+
         # Create tabs for different views
         tab1, tab2, tab3 = st.tabs([" Time Series", "Correlation", "Table"])
 
         with tab1:
-            # Time series with dual y-axis
-            fig_timeseries = go.Figure()
-            
-            fig_timeseries.add_trace(go.Scatter(
-                x=global_combined['Year'], 
-                y=global_combined['Temperature_Anomaly'], 
-                name='Temperature Anomaly', 
-                line=dict(color='red', width=3),
-                yaxis='y1'
-            ))
-            
-            fig_timeseries.add_trace(go.Scatter(
-                x=global_combined['Year'], 
-                y=global_combined['CO\u2082'], 
-                name='Global CO₂ Emissions', 
-                line=dict(color='blue', width=3),
-                yaxis='y2'
-            ))
-            
-            fig_timeseries.update_layout(
-                title='Global Temperature and CO₂ Emissions Over Time',
-                yaxis=dict(title='Temperature Anomaly (°C)', side='left'),
-                yaxis2=dict(title='CO₂ Emissions (kt)', side='right', overlaying='y'),
-                template='plotly_white'
-            )
-            
             st.plotly_chart(fig_timeseries, use_container_width=True)
 
         with tab2:
-            # Correlation scatter plot
-            fig_correlation = px.scatter(
-                global_combined,
-                x='CO\u2082',
-                y='Temperature_Anomaly',
-                color='Year',
-                title='The Relationship: Higher Emissions → Higher Temperatures',
-                labels={'CO\u2082': 'CO₂ Emissions (kt)', 'Temperature_Anomaly': 'Temperature Anomaly (°C)'},
-                color_continuous_scale='Viridis'
-            )
-            
-            # Add trend line
-            fig_correlation.add_trace(go.Scatter(
-                x=global_combined['CO\u2082'],
-                y=global_combined['Temperature_Anomaly'],
-                mode='lines',
-                name='Trend',
-                line=dict(color='purple', width=2),
-                showlegend=True
-            ))
-            
             st.plotly_chart(fig_correlation, use_container_width=True)
 
         with tab3:
             st.dataframe(global_combined)
-            csv = global_combined.to_csv(index=False)
+            csv = to_csv_bytes(global_combined)
             st.download_button(
                 label="Download emissions-temperature data as CSV",
                 data=csv,
@@ -256,8 +408,7 @@ def render_climate_impact_page(sidebar_data):
                 mime='text/csv',
             )
 
-        # Calculate and display correlation
-        correlation = global_combined['Temperature_Anomaly'].corr(global_combined['CO\u2082'])
+        # Display correlation
         st.info(f"""
         **Statistical Insight**: The correlation between global CO₂ emissions and temperature anomalies is **{correlation:.3f}**.
         This strong positive correlation confirms the scientific understanding that emissions drive global warming.
@@ -280,7 +431,6 @@ def render_climate_impact_page(sidebar_data):
             st.metric("Extreme Events", f"{total_events}", 
                      help="Total recorded extreme weather events")
         with col2:
-            total_deaths = country_weather['Total Deaths'].sum()
             st.metric("Lives Lost", f"{total_deaths:,}", 
                      delta="Human cost", delta_color="inverse")
         with col3:
@@ -295,14 +445,12 @@ def render_climate_impact_page(sidebar_data):
         # Enhanced event analysis
         st.markdown("####  Extreme Weather Analysis")
         
+        disaster_summary = weather_aggregates['disaster_summary']
+
         analysis_tabs = st.tabs([" Frequency Over Time", " Event Types", " Severity Analysis", "Data Table"])
         
         with analysis_tabs[0]:
-            yearly_events = country_weather.groupby('Year').agg({
-                'Year': 'count',
-                'Total Deaths': 'sum',
-                'Total Affected': 'sum'
-            }).rename(columns={'Year': 'Number of Events'}).reset_index()
+            yearly_events = weather_aggregates['yearly_events']
             
             fig_events = px.bar(
                 yearly_events,
@@ -314,15 +462,15 @@ def render_climate_impact_page(sidebar_data):
             )
             st.plotly_chart(fig_events, use_container_width=True)
             
-            if len(yearly_events) > 1:
-                trend_slope = np.polyfit(yearly_events['Year'], yearly_events['Number of Events'], 1)[0]
+            trend_slope = weather_aggregates['event_trend_slope']
+            if trend_slope is not None:
                 if trend_slope > 0:
                     st.warning(f" **Increasing Trend**: Extreme weather events are becoming more frequent (+{trend_slope:.2f} events/year on average)")
                 else:
                     st.info(f" **Stable/Decreasing Trend**: Event frequency is stable or decreasing ({trend_slope:.2f} events/year)")
         
         with analysis_tabs[1]:
-            event_types = country_weather['Disaster Type'].value_counts()
+            event_types = weather_aggregates['event_types']
             fig_types = px.pie(
                 values=event_types.values,
                 names=event_types.index,
@@ -336,14 +484,8 @@ def render_climate_impact_page(sidebar_data):
         
         with analysis_tabs[2]:
             if not country_weather.empty:
-                severity_data = country_weather.groupby('Disaster Type').agg({
-                    'Total Deaths': 'sum',
-                    'Total Affected': 'sum',
-                    'Year': 'count'
-                }).rename(columns={'Year': 'Event Count'}).reset_index()
-                
                 fig_severity = px.scatter(
-                    severity_data,
+                    disaster_summary,
                     x='Total Deaths',
                     y='Total Affected',
                     size='Event Count',
@@ -361,7 +503,7 @@ def render_climate_impact_page(sidebar_data):
             
             with col1:
                 # Raw event data
-                csv_raw = country_weather.to_csv(index=False)
+                csv_raw = to_csv_bytes(country_weather)
                 st.download_button(
                     label="Download raw event data",
                     data=csv_raw,
@@ -371,12 +513,7 @@ def render_climate_impact_page(sidebar_data):
             
             with col2:
                 # Aggregated yearly summary
-                yearly_summary = country_weather.groupby('Year').agg({
-                    'Total Deaths': 'sum',
-                    'Total Affected': 'sum',
-                    'Disaster Type': 'count'
-                }).reset_index()
-                csv_summary = yearly_summary.to_csv(index=False)
+                csv_summary = to_csv_bytes(weather_aggregates['yearly_summary'])
                 st.download_button(
                     label="Download yearly summary",
                     data=csv_summary,
@@ -386,14 +523,9 @@ def render_climate_impact_page(sidebar_data):
 
             # Add disaster type summary
             st.subheader("Disaster Type Summary")
-            disaster_summary = country_weather.groupby('Disaster Type').agg({
-                'Total Deaths': 'sum',
-                'Total Affected': 'sum',
-                'Year': 'count'
-            }).reset_index()
             st.dataframe(disaster_summary)
             
-            csv_disaster = disaster_summary.to_csv(index=False)
+            csv_disaster = to_csv_bytes(disaster_summary)
             st.download_button(
                 label="Download disaster type summary",
                 data=csv_disaster,
@@ -405,23 +537,13 @@ def render_climate_impact_page(sidebar_data):
         
         # Calculate more insights
         if not global_combined.empty and not country_weather.empty:
-            global_correlation = global_combined['Temperature_Anomaly'].corr(global_combined['CO\u2082'])
-            
-            # Try to calculate national correlation if we have enough data
-            national_combined = pd.merge(
-                country_weather.groupby('Year').size().reset_index(name='Event Count'),
-                total_emissions_df[['Year', co2_column]],
-                on='Year',
-                how='inner'
-            )
-            
             insights_col1, insights_col2 = st.columns(2)
             
             with insights_col1:
                 st.markdown(f"""
                 ####  **Global Climate Science**
                 
-                - **Strong Evidence**: {global_correlation:.3f} correlation between emissions and temperature
+                - **Strong Evidence**: {correlation:.3f} correlation between emissions and temperature
                 - **Temperature Rise**: {temp_change:.2f}°C increase since {year_range[0]}
                 - **Scientific Consensus**: This warming is primarily human-caused
                 
@@ -434,7 +556,7 @@ def render_climate_impact_page(sidebar_data):
                 
                 - **{total_events} extreme events** recorded in {selected_country_folder}
                 - **{total_affected:,} people affected** by climate disasters
-                - **Most common threat**: {country_weather['Disaster Type'].mode().iloc[0] if not country_weather.empty else 'N/A'}
+                - **Most common threat**: {most_common_disaster}
                 """)
         
         # Add a call to action
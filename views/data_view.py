@@ -4,8 +4,116 @@ Provides data exploration and download functionality.
 """
 
 import streamlit as st
-import pandas as pd
+import io
 import os
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from helper.data_loader import DATA_ROOT, LEVEL_FOLDERS
+from helper.utils import write_csv_bytes
+
+
+# Dataset name and level folder of each country hierarchy level
+# (e.g. 'Sectors' -> "Sector Emissions" in the 'sectors' folder)
+COUNTRY_DATASETS = tuple(
+    (f"{level.removesuffix('s')} Emissions", folder) for level, folder in LEVEL_FOLDERS.items()
+)
+
+# Datasets shared by every country
+GLOBAL_DATASETS = {
+    "Extreme Weather": "data/climate/processed_/summary_extreme_weather_all_countries.parquet",
+    "Temperature Anomalies": "data/climate/processed_/global_temp_anomalies.parquet",
+    "Global Emissions": "data/climate/processed_/global_emissions.parquet"
+}
+
+# Description of each dataset shown below the explorer
+DATASET_DESCRIPTIONS = {
+    "Total Emissions": "Complete greenhouse gas emissions data aggregated at the national level.",
+    "Sector Emissions": "Emissions broken down by major economic sectors (Energy, Industry, Agriculture, etc.).",
+    "Subsector Emissions": "More detailed breakdown within each major sector.",
+    "Sub-subsector Emissions": "Most granular level of sectoral breakdown available.",
+    "Extreme Weather": "Records of extreme weather events including deaths, affected populations, and economic damages.",
+    "Temperature Anomalies": "Global temperature deviations from the 20th century average (1951-1980 baseline).",
+    "Global Emissions": "Global Emissions from Our World in Data."
+}
+
+
+@st.cache_resource(show_spinner=False, ttl=24 * 60 * 60)
+def _get_dataset_year_bounds(dataset_path):
+    """(first, last) year of one dataset file, or None if it has no years
+
+    Only the schema and the Year column are read. Re-read at most daily, so
+    reprocessed files show up without a restart.
+    """
+    if 'Year' not in pq.read_schema(dataset_path).names:
+        return None
+    year_bounds = pc.min_max(pq.read_table(dataset_path, columns=['Year'])['Year']).as_py()
+    if year_bounds['min'] is None:
+        return None
+    return int(year_bounds['min']), int(year_bounds['max'])
+
+
+@st.cache_resource(max_entries=50, show_spinner=False, ttl=24 * 60 * 60)
+def _load_dataset(dataset_path, year_range=None):
+    """Read one dataset file, only decoding the rows of the selected years
+
+    The year filter is pushed into the parquet scan, so row groups outside the
+    range are skipped. The frame is shared read-only across reruns and sessions.
+    """
+    year_filter = None
+    if year_range is not None:
+        year_filter = (ds.field('Year') >= year_range[0]) & (ds.field('Year') <= year_range[1])
+    return ds.dataset(dataset_path, format='parquet').to_table(filter=year_filter).to_pandas()
+
+
+@st.cache_data(max_entries=50, show_spinner=False, ttl=24 * 60 * 60)
+def _get_dataset_csv(dataset_path, year_range=None):
+    """CSV bytes of one dataset file for the selected years
+
+    Keyed on the path and year range, so reruns don't hash or re-serialise the frame.
+    """
+    return write_csv_bytes(_load_dataset(dataset_path, year_range))
+
+
+@st.cache_data(max_entries=50, show_spinner=False, ttl=24 * 60 * 60)
+def _get_dataset_parquet(dataset_path, year_range=None):
+    """Parquet bytes of one dataset file for the selected years
+
+    Columnar and typed, so it is written without formatting every cell as text.
+    """
+    buffer = io.BytesIO()
+    _load_dataset(dataset_path, year_range).to_parquet(buffer, engine='pyarrow', compression='zstd', index=False)
+    return buffer.getvalue()
+
+
+@st.cache_data(show_spinner=False, ttl=24 * 60 * 60)
+def _get_dataset_options(country):
+    """Dataset name -> file path for one country, including its gas species files
+
+    The folders are scanned once per country (re-scanned at most daily, like the files).
+    """
+    dataset_options = {
+        name: os.path.join(DATA_ROOT, country, level, f"{country}_{level}_combined.parquet")
+        for name, level in COUNTRY_DATASETS
+    }
+    dataset_options.update(GLOBAL_DATASETS)
+
+    # Add gas versions of each hierarchy level
+    gas_species_folder = os.path.join(DATA_ROOT, country)
+    if os.path.exists(gas_species_folder):
+        # DirEntry.is_dir() uses the type from the directory read, so no stat per entry
+        with os.scandir(gas_species_folder) as entries:
+            gas_folders = sorted(entry.name for entry in entries if entry.is_dir())
+
+        for gas_folder in gas_folders:
+            gas = gas_folder.upper()
+            for _, level in COUNTRY_DATASETS:
+                combined_file = os.path.join(gas_species_folder, gas_folder, level, f"{country}_{level}_{gas.lower()}_combined.parquet")
+                if os.path.exists(combined_file):
+                    key = f"{gas} - {level.capitalize()} Emissions"
+                    dataset_options[key] = combined_file
+
+    return dataset_options
 
 
 def render_data_view_page(sidebar_data):
@@ -17,7 +125,7 @@ def render_data_view_page(sidebar_data):
             - year_range (tuple): Selected year range (start_year, end_year)
             - selected_country_folder (str): Currently selected country
             - selected_hierarchy (str): Selected sector hierarchy level
-            - selected_sectors (list): List of selected sectors to display
+            - selected_sectors (frozenset): Selected sectors to display
 
     Returns:
         None - Renders content directly to Streamlit page
@@ -30,80 +138,57 @@ def render_data_view_page(sidebar_data):
     st.header("Data Explorer & Download")
     st.markdown("Browse and download datasets including GHG emissions, gas species, temperature anomalies, and extreme weather events.")
 
-    # root directory
-    data_root = "data/processed_data"
-    
-    dataset_options = {
-        "Total Emissions": os.path.join(data_root, selected_country_folder, "total", f"{selected_country_folder}_total_combined.parquet"),
-        "Sector Emissions": os.path.join(data_root, selected_country_folder, "sectors", f"{selected_country_folder}_sectors_combined.parquet"),
-        "Subsector Emissions": os.path.join(data_root, selected_country_folder, "subsectors", f"{selected_country_folder}_subsectors_combined.parquet"),
-        "Sub-subsector Emissions": os.path.join(data_root, selected_country_folder, "sub_subsectors", f"{selected_country_folder}_sub_subsectors_combined.parquet"),
-        "Extreme Weather": "data/climate/processed_/summary_extreme_weather_all_countries.parquet",
-        "Temperature Anomalies": "data/climate/processed_/global_temp_anomalies.parquet",
-        "Global Emissions": "data/climate/processed_/global_emissions.parquet"
-    }
-
-    
-    # Add gas versions of each hierarchy level
-    gas_species_folder = os.path.join(data_root, selected_country_folder)
-    if os.path.exists(gas_species_folder):
-        for gas_folder in os.listdir(gas_species_folder):
-            gas_path = os.path.join(gas_species_folder, gas_folder)
-            if not os.path.isdir(gas_path):
-                continue
-
-            gas = gas_folder.upper()
-            for level in ["total", "sectors", "subsectors", "sub_subsectors"]:
-                combined_file = os.path.join(gas_path, level, f"{selected_country_folder}_{level}_{gas.lower()}_combined.parquet")
-                if os.path.exists(combined_file):
-                    key = f"{gas} - {level.capitalize()} Emissions"
-                    dataset_options[key] = combined_file
+    dataset_options = _get_dataset_options(selected_country_folder)
 
     selected_dataset_name = st.selectbox("Select a dataset to explore", list(dataset_options.keys()))
     dataset_path = dataset_options[selected_dataset_name]
 
     if os.path.exists(dataset_path):
-        df = pd.read_parquet(dataset_path)
+        year_bounds = _get_dataset_year_bounds(dataset_path)
 
-        if 'Year' in df.columns:
-            years = sorted(df['Year'].dropna().unique())
-            year_filter = st.slider("Filter by Year", min_value=int(min(years)), max_value=int(max(years)),
-                                    value=(int(min(years)), int(max(years))))
-            df = df[df['Year'].between(year_filter[0], year_filter[1])]
+        year_filter = None
+        if year_bounds is not None:
+            year_filter = tuple(st.slider("Filter by Year", min_value=year_bounds[0], max_value=year_bounds[1],
+                                          value=year_bounds))
+        df = _load_dataset(dataset_path, year_filter)
 
         st.write(f"Preview of **{selected_dataset_name}**")
         st.dataframe(df.head(100))
 
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label=f"Download {selected_dataset_name} as CSV",
-            data=csv,
-            file_name=f"{selected_dataset_name.replace(' ', '_').lower()}.csv",
-            mime='text/csv'
+        download_format = st.radio(
+            "Format",
+            options=["CSV", "Parquet"],
+            horizontal=True,
+            key="data_view_format"
         )
+        file_stem = selected_dataset_name.replace(' ', '_').lower()
+        if download_format == "Parquet":
+            st.download_button(
+                label=f"Download {selected_dataset_name} as Parquet",
+                data=_get_dataset_parquet(dataset_path, year_filter),
+                file_name=f"{file_stem}.parquet",
+                mime="application/octet-stream"
+            )
+        else:
+            csv = _get_dataset_csv(dataset_path, year_filter)
+            st.download_button(
+                label=f"Download {selected_dataset_name} as CSV",
+                data=csv,
+                file_name=f"{file_stem}.csv",
+                mime='text/csv'
+            )
     else:
         st.warning("Dataset not found.")
 
     st.markdown("---")
     st.subheader("Dataset Descriptions")
     
-    # Add dataset descriptions
-    descriptions = {
-        "Total Emissions": "Complete greenhouse gas emissions data aggregated at the national level.",
-        "Sector Emissions": "Emissions broken down by major economic sectors (Energy, Industry, Agriculture, etc.).",
-        "Subsector Emissions": "More detailed breakdown within each major sector.",
-        "Sub-subsector Emissions": "Most granular level of sectoral breakdown available.",
-        "Extreme Weather": "Records of extreme weather events including deaths, affected populations, and economic damages.",
-        "Temperature Anomalies": "Global temperature deviations from the 20th century average (1951-1980 baseline).",
-        "Global Emissions": "Global Emissions from Our World in Data."
-    }
-    
     # Display expandable sections in description
-    for dataset_name, description in descriptions.items():
+    for dataset_name, description in DATASET_DESCRIPTIONS.items():
         if dataset_name in dataset_options:
             with st.expander(f" {dataset_name}"):
                 st.write(description)
-                if dataset_name in ["Total Emissions", "Sector Emissions", "Subsector Emissions", "Sub-subsector Emissions"]:
+                if dataset_name not in GLOBAL_DATASETS:
                     st.write(f"**Country**: {selected_country_folder}")
                     st.write("**Source**: UNFCCC National Inventory Submissions")
                 elif dataset_name == "Extreme Weather":
@@ -3,12 +3,58 @@ Emissions Trends page for the GHG Emissions Dashboard.
 Shows detailed emissions trends analysis for individual countries.
 """
 
+import io
+import os
+import csv
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-from helper.utils import get_co2_column, get_other_gas_columns
+from helper.utils import get_px, to_csv_bytes, write_csv_bytes
+from data_content.gas_information import gas_details
+
+
+# Policy milestones annotated on the CO2 chart: (year, label, symbol)
+MILESTONES = [
+    (1997, "Kyoto Protocol", "↓"),
+    (2015, "Paris Agreement", "↓"),
+    (2020, "COVID Impact", "↓")
+]
+
+# Colour of each gas in the portfolio pie chart
+GAS_COLORS = {
+    'CO₂': '#1f77b4',
+    'CH₄': '#ff7f0e',
+    'N₂O': '#2ca02c',
+    'SF₆': '#d62728',
+    'HFCs': '#9467bd',
+    'PFCs': '#8c564b'
+}
+
+# Line colours for the selected gases, in selection order
+GAS_LINE_COLORS = list(GAS_COLORS.values())
+
+
+@st.cache_data(max_entries=50, show_spinner=False)
+def _complete_dataset_csv(_filtered_total_df, country, year_range):
+    """CSV bytes of the complete filtered dataset for one country and year range
+
+    The filtered frame is not hashed (leading underscore); it is derived from
+    the pre-loaded data by country and year range, which are the key. Its
+    Country column already holds the country folder name, so it is written as is.
+    """
+    return write_csv_bytes(_filtered_total_df)
+
+
+@st.cache_data(max_entries=50, show_spinner=False)
+def _complete_dataset_parquet(_filtered_total_df, country, year_range):
+    """Parquet bytes of the complete filtered dataset for one country and year range
+
+    Columnar and typed, so it is written without formatting every cell as text.
+    """
+    buffer = io.BytesIO()
+    _filtered_total_df.to_parquet(buffer, engine='pyarrow', compression='zstd', index=False)
+    return buffer.getvalue()
 
 
 def render_emissions_trends_page(sidebar_data):
@@ -20,7 +66,9 @@ def render_emissions_trends_page(sidebar_data):
             - year_range (tuple): Selected year range (start_year, end_year)
             - selected_country_folder (str): Currently selected country
             - selected_hierarchy (str): Selected sector hierarchy level
-            - selected_sectors (list): List of selected sectors to display
+            - selected_sectors (frozenset): Selected sectors to display
+            - co2_column (str): Name of the CO2 column in the emissions data
+            - other_gas_columns (list): Names of the non-CO2 gas columns
 
     Returns:
         None - Renders content directly to Streamlit page
@@ -30,6 +78,7 @@ def render_emissions_trends_page(sidebar_data):
     total_emissions_df = sidebar_data['total_emissions_df']
     selected_country_folder = sidebar_data['selected_country_folder']
     year_range = sidebar_data['year_range']
+    px = get_px()
     
     st.header(f"{selected_country_folder}'s Emissions Trends")
     st.write("Greenhouse gases (GHGs) differ in how they're produced and how strongly they warm the planet. "
@@ -38,25 +87,43 @@ def render_emissions_trends_page(sidebar_data):
     
     
     # Get gas columns
-    co2_column = get_co2_column(total_emissions_df)
-    other_gas_columns = get_other_gas_columns(total_emissions_df)
+    co2_column = sidebar_data['co2_column']
+    other_gas_columns = sidebar_data['other_gas_columns']
+
+    # Gas columns shared by the portfolio and the gas selector
+    available_gases = (co2_column, *other_gas_columns)
     
     # Filter data
     filtered_total_df = total_emissions_df[
         total_emissions_df['Year'].between(year_range[0], year_range[1])
     ].copy()
     
+    # Rows are sorted by year at load, so the range ends are the first and last positions
+    year_values = filtered_total_df['Year'].to_numpy()
+    co2_values = filtered_total_df[co2_column].to_numpy(dtype='float64', na_value=np.nan)
+
     # Calculate key metrics for storytelling
-    latest_year = filtered_total_df['Year'].max()
-    earliest_year = filtered_total_df['Year'].min()
-    
-    latest_co2 = filtered_total_df[filtered_total_df['Year'] == latest_year][co2_column].iloc[0]
-    earliest_co2 = filtered_total_df[filtered_total_df['Year'] == earliest_year][co2_column].iloc[0]
+    latest_year = year_values[-1]
+    earliest_year = year_values[0]
+    latest_co2 = co2_values[-1]
+    earliest_co2 = co2_values[0]
     co2_change = ((latest_co2 - earliest_co2) / earliest_co2) * 100
     
-    # Calculate trend
-    z = np.polyfit(filtered_total_df['Year'], filtered_total_df[co2_column], 1)
-    slope = z[0]
+    # One row per year: look values up by year instead of masking the frame each time
+    by_year = filtered_total_df.set_index('Year')
+    
+    # Calculate trend: least-squares slope in closed form (no SVD for a straight line)
+    years = year_values.astype('float64')
+    year_offsets = years - years.mean()
+    year_spread = year_offsets @ year_offsets
+    slope = (year_offsets @ (co2_values - co2_values.mean())) / year_spread if year_spread else 0.0
+    intercept = co2_values.mean() - slope * years.mean()
+
+    # Headline statistics from the same array instead of separate pandas reductions
+    peak_index = np.nanargmax(co2_values)
+    peak_co2 = co2_values[peak_index]
+    peak_year = filtered_total_df['Year'].iat[peak_index]
+    mean_co2 = np.nanmean(co2_values)
     
     
     # Summary metrics increase ir decrease
@@ -79,8 +146,8 @@ def render_emissions_trends_page(sidebar_data):
     with col1:
         st.metric(
             label="Peak Emissions",
-            value=f"{filtered_total_df[co2_column].max():,.0f} kt",
-            delta=f"in {filtered_total_df.loc[filtered_total_df[co2_column].idxmax(), 'Year']}"
+            value=f"{peak_co2:,.0f} kt",
+            delta=f"in {peak_year}"
         )
     
     with col2:
@@ -136,10 +203,9 @@ def render_emissions_trends_page(sidebar_data):
         ))
         
         # Add trend line
-        years_range = np.array(filtered_total_df['Year'])
-        trend_line = z[0] * years_range + z[1]
+        trend_line = slope * years + intercept
         fig.add_trace(go.Scatter(
-            x=years_range,
+            x=filtered_total_df['Year'].to_numpy(),
             y=trend_line,
             mode='lines',
             name='Trend',
@@ -147,17 +213,10 @@ def render_emissions_trends_page(sidebar_data):
         ))
         
         # Add milestone annotations
-        milestones = [
-            (1997, "Kyoto Protocol", "↓"),
-            (2015, "Paris Agreement", "↓"),
-            (2020, "COVID Impact", "↓")
-        ]
-        
-        for year, event, symbol in milestones:
+        for year, event, symbol in MILESTONES:
             if year_range[0] <= year <= year_range[1]:
-                year_data = filtered_total_df[filtered_total_df['Year'] == year]
-                if not year_data.empty:
-                    value = year_data[co2_column].iloc[0]
+                if year in by_year.index:
+                    value = by_year.at[year, co2_column]
                     fig.add_annotation(
                         x=year,
                         y=value,
@@ -190,7 +249,7 @@ def render_emissions_trends_page(sidebar_data):
         co2_data = filtered_total_df[['Year', co2_column]]  
         st.dataframe(co2_data)
         
-        csv_co2 = co2_data.to_csv(index=False)
+        csv_co2 = to_csv_bytes(co2_data)
         st.download_button(
             label="Download CO\u2082 Data as CSV",
             data=csv_co2,
@@ -202,21 +261,17 @@ def render_emissions_trends_page(sidebar_data):
     st.subheader(" Greenhouse Gas Portfolio")
     
     # Calculate percentages
-    latest_data = filtered_total_df[filtered_total_df['Year'] == latest_year]
-    total_emissions = latest_data[co2_column].iloc[0]
-    
-    gas_data = []
-    for gas in [co2_column] + other_gas_columns:
-        if gas in latest_data.columns:
-            value = latest_data[gas].iloc[0]
-            if value > 0:
-                gas_data.append({
-                    'Gas': gas.replace(' (kt)', ''),
-                    'Emissions': value,
-                    'Percentage': (value / total_emissions) * 100
-                })
-    
-    gas_df = pd.DataFrame(gas_data)
+    total_emissions = by_year.at[latest_year, co2_column]
+
+    # Latest year's gases as one vector; Arrow <NA> becomes NaN and is dropped by the > 0 test
+    gas_columns = [gas for gas in available_gases if gas in by_year.columns]
+    gas_values = by_year.loc[latest_year, gas_columns].to_numpy(dtype='float64', na_value=np.nan)
+    emitted = gas_values > 0
+    gas_df = pd.DataFrame({
+        'Gas': [gas.replace(' (kt)', '') for gas, keep in zip(gas_columns, emitted) if keep],
+        'Emissions': gas_values[emitted],
+        'Percentage': gas_values[emitted] / total_emissions * 100
+    })
     d3, d4 = st.tabs(["Graph", "Table"])
     with d3:
         # Create pie chart
@@ -225,14 +280,7 @@ def render_emissions_trends_page(sidebar_data):
             values='Emissions',
             names='Gas',
             title=f"Emission Portfolio - {latest_year}",
-            color_discrete_map={
-                'CO₂': '#1f77b4',
-                'CH₄': '#ff7f0e',
-                'N₂O': '#2ca02c',
-                'SF₆': '#d62728',
-                'HFCs': '#9467bd',
-                'PFCs': '#8c564b'
-            }
+            color_discrete_map=GAS_COLORS
         )
         
         st.plotly_chart(fig_pie, use_container_width=True)
@@ -241,7 +289,7 @@ def render_emissions_trends_page(sidebar_data):
         st.subheader("Gas Portfolio Data Table")
         st.dataframe(gas_df)
         
-        csv_gas_portfolio = gas_df.to_csv(index=False)
+        csv_gas_portfolio = to_csv_bytes(gas_df)
         st.download_button(
             label="Download Gas Portfolio Data as CSV",
             data=csv_gas_portfolio,
@@ -257,7 +305,7 @@ def render_emissions_trends_page(sidebar_data):
     # Gas selection for other gases
     selected_gases = st.multiselect(
         "Select Gases for Emissions Trends",
-        options=[co2_column] + other_gas_columns,
+        options=available_gases,
         default=[co2_column]
     )
     
@@ -266,8 +314,6 @@ def render_emissions_trends_page(sidebar_data):
         
         fig_gas = go.Figure()
         
-        colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b']
-        
         for i, gas in enumerate(selected_gases):
             if gas in filtered_total_df.columns:
                 fig_gas.add_trace(go.Scatter(
@@ -275,7 +321,7 @@ def render_emissions_trends_page(sidebar_data):
                     y=filtered_total_df[gas],
                     mode='lines+markers',
                     name=gas.replace(' (kt)', ''),
-                    line=dict(width=3, color=colors[i % len(colors)])
+                    line=dict(width=3, color=GAS_LINE_COLORS[i % len(GAS_LINE_COLORS)])
                 ))
         
         fig_gas.update_layout(
@@ -293,7 +339,7 @@ def render_emissions_trends_page(sidebar_data):
         selected_gases_data = filtered_total_df[['Year'] + selected_gases]
         st.dataframe(selected_gases_data)
         
-        csv_selected_gases = selected_gases_data.to_csv(index=False)
+        csv_selected_gases = to_csv_bytes(selected_gases_data)
         st.download_button(
             label="Download Selected Gases Data as CSV",
             data=csv_selected_gases,
@@ -308,60 +354,11 @@ def render_emissions_trends_page(sidebar_data):
 
     st.markdown("#### Gas Information")
 
-    if "CO\u2082 (kt)" in selected_gases:
-        with st.expander("Carbon Dioxide (CO₂)"):
-            st.markdown("""
-            CO₂ is the most abundant human-emitted greenhouse gas. 
-            It mainly comes from **fossil fuel combustion**, **deforestation**, and **Industrial Processes**.
-            While less potent per molecule than other gases, it stays in the atmosphere for **hundreds of years**.
-
-            **Info**: CO₂ accounts for over **75% of global GHG emissions**.
-            """)
-
-    if "CH\u2084 (kt)" in selected_gases:
-        with st.expander(" Methane (CH₄)"):
-            st.markdown("""
-            Methane is a **short-lived climate pollutant**  over **25 times stronger than CO₂** over 100 years.
-            It's mainly released by **livestock**, **landfills**, and **fossil fuel extraction**.
-                            
-            Methane breaks down faster than CO₂ but has a **much greater global warming potential** in the short term.
-            """)
-
-    if "N\u2082O (kt)" in selected_gases:
-        with st.expander("Nitrous Oxide (N₂O)"):
-            st.markdown("""
-            N₂O has a **global warming potential ~300 times that of CO₂**.
-            It is mostly emitted from **agricultural activities**, especially **fertiliser use**, as well as **wastewater** and **industry**.
-            
-            It also contributes to the **depletion of the ozone layer**.
-            """)
-
-    if "HFCs (kt)" in selected_gases:
-        with st.expander(" Hydrofluorocarbons (HFCs)"):
-            st.markdown("""
-            HFCs are synthetic gases used in **air conditioning**, **refrigeration**, and **aerosol propellants**.
-            Their warming potential ranges from **hundreds to thousands of times** stronger than CO₂.
-            
-            Many are being phased out under international agreements like the **Kigali Amendment**.
-            """)
-
-    if "PFCs (kt)" in selected_gases:
-        with st.expander(" Perfluorocarbons (PFCs)"):
-            st.markdown("""
-            PFCs are emitted during **aluminium production** and **semiconductor manufacturing**.
-            They are extremely long-lived, lasting **up to 50,000 years**.
-
-            Though emissions are low, their **climate impact is significant** per molecule.
-            """)
-
-    if "SF\u2086 (kt)" in selected_gases:
-        with st.expander(" Sulphur Hexafluoride (SF₆)"):
-            st.markdown("""
-            SF₆ is mainly used as an **insulating gas** in electrical systems.
-            It is the **most potent greenhouse gas**, with a GWP more than **23,000 times greater than CO₂** over 100 years.
-
-            Despite small quantities, its **impact is large** due to its strength and long atmospheric lifetime.
-            """)
+    selected_gas_set = set(selected_gases)
+    for gas, (title, details) in gas_details.items():
+        if gas in selected_gas_set:
+            with st.expander(title):
+                st.markdown(details)
     
     
     # Download section
@@ -371,32 +368,49 @@ def render_emissions_trends_page(sidebar_data):
     
     with col1:
         # Prepare comprehensive dataset
-        download_df = filtered_total_df.copy()
-        download_df['Country'] = selected_country_folder
-        
-        csv = download_df.to_csv(index=False)
-        st.download_button(
-            label="Download Complete Dataset",
-            data=csv,
-            file_name=f"{selected_country_folder}_emissions_{year_range[0]}_{year_range[1]}.csv",
-            mime="text/csv"
+        download_format = st.radio(
+            "Format",
+            options=["CSV", "Parquet"],
+            horizontal=True,
+            key="complete_dataset_format"
         )
+        file_stem = f"{selected_country_folder}_emissions_{year_range[0]}_{year_range[1]}"
+        if download_format == "Parquet":
+            st.download_button(
+                label="Download Complete Dataset",
+                data=_complete_dataset_parquet(filtered_total_df, selected_country_folder, tuple(year_range)),
+                file_name=f"{file_stem}.parquet",
+                mime="application/octet-stream"
+            )
+        else:
+            csv_complete = _complete_dataset_csv(filtered_total_df, selected_country_folder, tuple(year_range))
+            st.download_button(
+                label="Download Complete Dataset",
+                data=csv_complete,
+                file_name=f"{file_stem}.csv",
+                mime="text/csv"
+            )
     
     with col2:
         # Create summary statistics
         summary_stats = {
             'Metric': ['Average Annual Emissions', 'Peak Emissions', 'Latest Emissions', 'Total Change', 'Annual Trend'],
             'CO₂ (kt)': [
-                f"{filtered_total_df[co2_column].mean():,.0f}",
-                f"{filtered_total_df[co2_column].max():,.0f}",
+                f"{mean_co2:,.0f}",
+                f"{peak_co2:,.0f}",
                 f"{latest_co2:,.0f}",
                 f"{co2_change:+.1f}%",
                 f"{slope:+.0f}"
             ]
         }
         
-        summary_df = pd.DataFrame(summary_stats)
-        csv_summary = summary_df.to_csv(index=False)
+        # Five preformatted rows: written with the csv module (same quoting as
+        # pandas) instead of building a DataFrame just to serialise it
+        summary_buffer = io.StringIO()
+        summary_writer = csv.writer(summary_buffer, lineterminator=os.linesep)
+        summary_writer.writerow(summary_stats.keys())
+        summary_writer.writerows(zip(*summary_stats.values()))
+        csv_summary = summary_buffer.getvalue().encode('utf-8')
         st.download_button(
             label="Download Summary Statistics",
             data=csv_summary,
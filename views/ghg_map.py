@@ -4,8 +4,8 @@ Interactive world map showing CO2 emissions over time.
 """
 
 import streamlit as st
-import plotly.express as px
-from helper.utils import create_complete_map_figure, get_co2_column
+import numpy as np
+from helper.utils import create_complete_map_figure, get_year_country_matrix
 
 
 def render_ghg_map_page(sidebar_data):
@@ -18,7 +18,7 @@ def render_ghg_map_page(sidebar_data):
             - year_range (tuple): Selected year range (start_year, end_year)
             - selected_country_folder (str): Currently selected country
             - selected_hierarchy (str): Selected sector hierarchy level
-            - selected_sectors (list): List of selected sectors to display
+            - selected_sectors (frozenset): Selected sectors to display
 
     Returns:
         None - Renders content directly to Streamlit page
@@ -71,16 +71,26 @@ def render_ghg_map_page(sidebar_data):
 
     if all_emissions_df is not None and geojson is not None:
         # Add some quick stats before the map
-        co2_column = get_co2_column(all_emissions_df)
+        co2_column = all_emissions_df.attrs['co2_column']
         
-        # Calculate interesting statistics
-        total_emissions_latest = all_emissions_df[all_emissions_df['Year'] == year_range[1]][co2_column].sum()
-        total_emissions_earliest = all_emissions_df[all_emissions_df['Year'] == year_range[0]][co2_column].sum()
+        # Calculate interesting statistics from the shared year x country
+        # matrix (aggregated once): both years are a single row lookup
+        year_country_matrix = get_year_country_matrix(all_emissions_df, co2_column)
+        earliest_totals, latest_totals = year_country_matrix.reindex(list(year_range)).to_numpy()
+        total_emissions_latest = np.nansum(latest_totals)
+        total_emissions_earliest = np.nansum(earliest_totals)
         change_percent = ((total_emissions_latest - total_emissions_earliest) / total_emissions_earliest) * 100
         
-        # Top emitters
-        latest_year_data = all_emissions_df[all_emissions_df['Year'] == year_range[1]]
-        top_emitters = latest_year_data.nlargest(3, co2_column)['Country'].tolist()
+        # Top emitters: partial selection of the 3 largest, then order just those
+        reporting = ~np.isnan(latest_totals)
+        countries_tracked = int(reporting.sum())
+        n_top = min(3, countries_tracked)
+        top_emitters = []
+        if n_top:
+            ranked = np.where(reporting, latest_totals, -np.inf)
+            top_idx = np.argpartition(-ranked, n_top - 1)[:n_top]
+            top_idx = top_idx[np.argsort(-ranked[top_idx], kind='stable')]
+            top_emitters = year_country_matrix.columns[top_idx].tolist()
         
         # Quick insights box
         st.info(f"""
@@ -89,11 +99,11 @@ def render_ghg_map_page(sidebar_data):
         - **Total Change**: Annex I emissions have {'increased' if change_percent > 0 else 'decreased'} by **{abs(change_percent):.1f}%**
         - **Top 3 Emitters**: {', '.join(top_emitters)}
         - **Latest Total**: {total_emissions_latest:,.0f} kt CO₂ in {year_range[1]}
-        - **Countries Tracked**: {len(latest_year_data)} Annex I nations
+        - **Countries Tracked**: {countries_tracked} Annex I nations
         """)
         
         # Use cached complete figure
-        fig = create_complete_map_figure(all_emissions_df, year_range, geojson)
+        fig = create_complete_map_figure(all_emissions_df, year_range, geojson, co2_column)
         
         st.plotly_chart(fig, use_container_width=True)
         st.caption(" Use the play button to see emissions evolve over time, or drag the slider to jump to specific years!")
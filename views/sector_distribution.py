@@ -5,15 +5,139 @@ Shows detailed breakdown of emissions by sector over time.
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from helper.utils import get_co2_column, get_other_gas_columns
+import numpy as np
+from helper.utils import get_px, to_csv_bytes
 from data_content.gas_information import gas_explanations
 from data_content.chart_explanations import chart_explanations
 from data_content.sector_goals import global_climate_policies
 from data_content.policy_data import policy_data
 
 
+# Description and key policies of every country/level/sector as one markdown block,
+# joined once at import so each expander renders a single element
+POLICY_MARKDOWN = {
+    (country, level, name): (
+        details['description'] + "\n\n##### Key Policies:\n"
+        + "\n".join(f"- {policy}" for policy in details['policies'])
+    )
+    for country, levels in policy_data.items()
+    for level, entries in levels.items()
+    for name, details in entries.items()
+}
+
+
+@st.cache_resource(max_entries=50, show_spinner=False)
+def _filter_sector_data(_sector_df, country, hierarchy, year_range, sectors):
+    """Selected sectors and years of one hierarchy level, plus the latest year's rows
+
+    The level dataframe is not hashed (leading underscore); country and hierarchy
+    identify it. The frames are shared read-only, so other widgets reuse them.
+
+    Returns:
+        tuple: (filtered_sector_df, latest_year, latest_data)
+    """
+    # Level rows are sorted by year at load, so the year range is a binary-searched slice
+    level_years = _sector_df['Year'].to_numpy()
+    first_row = np.searchsorted(level_years, year_range[0], side='left')
+    last_row = np.searchsorted(level_years, year_range[1], side='right')
+    year_slice = _sector_df.iloc[first_row:last_row]
+
+    # The sidebar selects every sector by default: then there is nothing left to mask
+    sector_col = year_slice['GREENHOUSE GAS SOURCE AND SINK CATEGORIES']
+    if set(sector_col.cat.categories).issubset(sectors) and not sector_col.hasnans:
+        filtered_sector_df = year_slice
+    else:
+        # Sector column is categorical, so isin compares integer codes
+        filtered_sector_df = year_slice[sector_col.isin(sectors)]
+
+    # Rows stay in year order, so the latest year is the last block of the filtered frame
+    years = filtered_sector_df['Year'].to_numpy()
+    latest_year = int(years[-1]) if years.size else year_range[1]
+    latest_data = filtered_sector_df.iloc[np.searchsorted(years, latest_year, side='left'):]
+    return filtered_sector_df, latest_year, latest_data
+
+
+@st.cache_resource(max_entries=50, show_spinner=False)
+def _melt_latest_data(_latest_data, country, hierarchy, latest_year, sectors, gases):
+    """Melt the latest year's sector data to one row per sector and gas
+
+    The dataframe itself is not hashed (leading underscore); country, hierarchy,
+    latest_year and sectors identify it, so only a change of gases re-melts.
+    The melted frame is shared read-only, so a hit is not unpickled.
+    """
+    # Same layout as DataFrame.melt (one block of sectors per gas), built
+    # straight from the value matrix and the categorical codes
+    sectors_col = _latest_data['GREENHOUSE GAS SOURCE AND SINK CATEGORIES'].cat.remove_unused_categories()
+    gas_values = _latest_data[list(gases)].to_numpy(dtype='float64', na_value=np.nan)
+    n_sectors, n_gases = gas_values.shape
+
+    return pd.DataFrame({
+        'GREENHOUSE GAS SOURCE AND SINK CATEGORIES': pd.Categorical.from_codes(
+            np.tile(sectors_col.cat.codes.to_numpy(), n_gases), dtype=sectors_col.dtype
+        ),
+        # Gas names repeat once per sector: store codes, ordered like the selection
+        'Gas': pd.Categorical.from_codes(
+            np.repeat(np.arange(n_gases), n_sectors), categories=list(gases), ordered=True
+        ),
+        'Emissions_kt': gas_values.ravel(order='F')
+    })
+
+
+@st.cache_resource(max_entries=50, show_spinner=False)
+def _build_sector_bar_figure(_latest_data_melted, country, hierarchy, latest_year, sectors, gases):
+    """Bar chart of the latest year's emissions by sector and gas, built once per selection"""
+    px = get_px()
+
+    fig_bar = px.bar(
+        _latest_data_melted,
+        x='GREENHOUSE GAS SOURCE AND SINK CATEGORIES',
+        y='Emissions_kt',
+        color='Gas',
+        title=f'Emissions by Sector and Gas Type ({latest_year})',
+        labels={'Emissions_kt': 'Emissions (kt)',
+                'GREENHOUSE GAS SOURCE AND SINK CATEGORIES': 'Sector'}
+    )
+    fig_bar.update_layout(xaxis_tickangle=-45)
+    return fig_bar
+
+
+@st.cache_resource(max_entries=50, show_spinner=False)
+def _build_sector_pie_figure(_pie_data, country, hierarchy, latest_year, sectors, gas):
+    """Pie chart of one gas's latest-year emissions by sector, built once per selection"""
+    px = get_px()
+
+    return px.pie(
+        _pie_data,
+        values=gas,
+        names='GREENHOUSE GAS SOURCE AND SINK CATEGORIES',
+        title=f'Distribution of {gas} by Sector ({latest_year})'
+    )
+
+
+@st.cache_resource(max_entries=50, show_spinner=False)
+def _build_sector_time_figures(_filtered_sector_df, country, hierarchy, year_range, sectors, gas):
+    """Area and line charts of one gas by sector over time, built once per selection
+
+    Returns:
+        tuple: (fig_area, fig_line)
+    """
+    px = get_px()
+
+    # One row per year and sector, shared by both charts (min_count=1 keeps gaps as gaps)
+    sector_totals = _filtered_sector_df.groupby(
+        ['Year', 'GREENHOUSE GAS SOURCE AND SINK CATEGORIES'], observed=True, sort=False
+    )[gas].sum(min_count=1).reset_index()
+
+    chart_args = dict(
+        x='Year',
+        y=gas,
+        color='GREENHOUSE GAS SOURCE AND SINK CATEGORIES',
+        title=f'{gas} Emissions by Sector Over Time',
+        labels={'value': 'Emissions (kt)'}
+    )
+    return px.area(sector_totals, **chart_args), px.line(sector_totals, **chart_args)
+
+
 def render_sector_distribution_page(sidebar_data):
     """Render the Sector Distribution page
 
@@ -24,7 +148,9 @@ def render_sector_distribution_page(sidebar_data):
             - year_range (tuple): Selected year range (start_year, end_year)
             - selected_country_folder (str): Currently selected country
             - selected_hierarchy (str): Selected sector hierarchy level
-            - selected_sectors (list): List of selected sectors to display
+            - selected_sectors (frozenset): Selected sectors to display
+            - co2_column (str): Name of the CO2 column in the emissions data
+            - other_gas_columns (list): Names of the non-CO2 gas columns
 
     Returns:
         None - Renders content directly to Streamlit page
@@ -38,6 +164,9 @@ def render_sector_distribution_page(sidebar_data):
     selected_hierarchy = sidebar_data['selected_hierarchy']
     selected_sectors = sidebar_data['selected_sectors']  
 
+    # Order-independent cache key: reordering the selection reuses the cached results
+    sector_key = tuple(sorted(selected_sectors, key=str))
+
     # Display page header and description
     st.header("Sector Distribution")
     st.write("Here, you can explore a detailed breakdown of greenhouse gas emissions by sector over time. Below the charts, you'll find an overview of the specific climate policies implemented in the selected country to address these emissions.")
@@ -45,61 +174,53 @@ def render_sector_distribution_page(sidebar_data):
     # Check if emissions data is available
     if total_emissions_df is not None:
         # Get CO2 and other gas columns
-        co2_column = get_co2_column(total_emissions_df)
-        other_gas_columns = get_other_gas_columns(total_emissions_df)
+        co2_column = sidebar_data['co2_column']
+        other_gas_columns = sidebar_data['other_gas_columns']
+
+        # Gas options shared by the bar and pie chart selectors
+        available_gases = (co2_column, *other_gas_columns)
         
         # Get sector data
         sector_df = data_dict.get(selected_hierarchy)
         
         #Filter based on sector and year range
         if sector_df is not None:
-            # Filter sector data
-            filtered_sector_df = sector_df[
-                (sector_df['Year'].between(year_range[0], year_range[1])) &
-                (sector_df['GREENHOUSE GAS SOURCE AND SINK CATEGORIES'].isin(selected_sectors))
-            ]
+            # Filter sector data (cached, so other widgets don't re-filter)
+            filtered_sector_df, latest_year, latest_data = _filter_sector_data(
+                sector_df, selected_country_folder, selected_hierarchy,
+                tuple(year_range), sector_key
+            )
 
             # Gas selector for Bar Chart (Checkboxes)
-            available_gases_tab2_bar = [co2_column] + other_gas_columns
             selected_gases_tab2_bar = st.multiselect(
                 "Select Gases for Bar Chart",
-                options=available_gases_tab2_bar,
+                options=available_gases,
                 default=[co2_column]  # Default to CO2
             )
 
             # Bar chart of emissions by gas type for each sector
             st.subheader("Emissions by Sector and Gas Type")
-            latest_year = filtered_sector_df['Year'].max()
-            latest_data = filtered_sector_df[filtered_sector_df['Year'] == latest_year]
-
-            # Melt the data for the selected gases
-            latest_data_melted = latest_data.melt(
-                id_vars=['GREENHOUSE GAS SOURCE AND SINK CATEGORIES'],
-                value_vars=selected_gases_tab2_bar,
-                var_name='Gas',
-                value_name='Emissions_kt'
+
+            # Melt the data for the selected gases (cached, so other widgets don't re-melt)
+            latest_data_melted = _melt_latest_data(
+                latest_data, selected_country_folder, selected_hierarchy,
+                latest_year, sector_key, tuple(selected_gases_tab2_bar)
             )
 
             # Create tabs for chart and table view
             chart_tab1, table_tab1 = st.tabs(["Chart", "Table"])
             #Display bar chart
             with chart_tab1:
-                fig_bar = px.bar(
-                    latest_data_melted,
-                    x='GREENHOUSE GAS SOURCE AND SINK CATEGORIES',
-                    y='Emissions_kt',
-                    color='Gas',
-                    title=f'Emissions by Sector and Gas Type ({latest_year})',
-                    labels={'Emissions_kt': 'Emissions (kt)',
-                            'GREENHOUSE GAS SOURCE AND SINK CATEGORIES': 'Sector'}
+                fig_bar = _build_sector_bar_figure(
+                    latest_data_melted, selected_country_folder, selected_hierarchy,
+                    latest_year, sector_key, tuple(selected_gases_tab2_bar)
                 )
-                fig_bar.update_layout(xaxis_tickangle=-45)
                 st.plotly_chart(fig_bar, use_container_width=True, key='Sector bar chart')
             
             #Table download view
             with table_tab1:
                 st.dataframe(latest_data_melted)
-                csv = latest_data_melted.to_csv(index=False)
+                csv = to_csv_bytes(latest_data_melted)
                 st.download_button(
                     label="Download data as CSV",
                     data=csv,
@@ -107,14 +228,14 @@ def render_sector_distribution_page(sidebar_data):
                     mime='text/csv',
                 )
 
-            if selected_country_folder in chart_explanations:
-                st.write(chart_explanations[selected_country_folder])
+            chart_explanation = chart_explanations.get(selected_country_folder)
+            if chart_explanation:
+                st.write(chart_explanation)
 
             # Gas selector for Pie Chart (Dropdown)
-            available_gases_tab2_pie = [co2_column] + other_gas_columns
             selected_gas_tab2_pie = st.selectbox(
                 "Select Gas for Pie Chart",
-                options=available_gases_tab2_pie,
+                options=available_gases,
                 index=0  # Default to the first gas (CO2)
             )
             
@@ -122,24 +243,24 @@ def render_sector_distribution_page(sidebar_data):
             st.subheader("Distribution of Emissions by Sector")
             chart_tab2, table_tab2 = st.tabs(["Chart", "Table"])
 
+            # Only the sector name and selected gas go to the chart and table
+            pie_table = latest_data[['GREENHOUSE GAS SOURCE AND SINK CATEGORIES', selected_gas_tab2_pie]]
+
             # Option 1: Filter out negative values
-            pie_data = latest_data[latest_data[selected_gas_tab2_pie] > 0]  # Only keep positive values
+            pie_data = pie_table[pie_table[selected_gas_tab2_pie] > 0]  # Only keep positive values
 
             # Pie chart display
             with chart_tab2:
-                fig_pie = px.pie(
-                    pie_data,
-                    values=selected_gas_tab2_pie,
-                    names='GREENHOUSE GAS SOURCE AND SINK CATEGORIES',
-                    title=f'Distribution of {selected_gas_tab2_pie} by Sector ({latest_year})'
+                fig_pie = _build_sector_pie_figure(
+                    pie_data, selected_country_folder, selected_hierarchy,
+                    latest_year, sector_key, selected_gas_tab2_pie
                 )
                 st.plotly_chart(fig_pie, use_container_width=True, key='Sector pie chart')
             
             #Table download
             with table_tab2:
-                pie_data = latest_data[['GREENHOUSE GAS SOURCE AND SINK CATEGORIES', selected_gas_tab2_pie]]
-                st.dataframe(pie_data)
-                csv = pie_data.to_csv(index=False)
+                st.dataframe(pie_table)
+                csv = to_csv_bytes(pie_table)
                 st.download_button(
                     label="Download data as CSV",
                     data=csv,
@@ -148,43 +269,32 @@ def render_sector_distribution_page(sidebar_data):
                 )
 
             # Display the explanation for the selected gas
-            if selected_gas_tab2_pie in gas_explanations:
-                st.write(gas_explanations[selected_gas_tab2_pie])
+            gas_explanation = gas_explanations.get(selected_gas_tab2_pie)
+            if gas_explanation:
+                st.write(gas_explanation)
 
             st.markdown("---")
             
             # Stacked area chart showing emissions by sector over time
             t1, t2, table_tab3 = st.tabs(['Area Chart', 'Line Chart', 'Table'])
             st.subheader("Emissions by Sector Over Time")
+            fig_area, fig_line = _build_sector_time_figures(
+                filtered_sector_df, selected_country_folder, selected_hierarchy,
+                tuple(year_range), sector_key, selected_gas_tab2_pie
+            )
             #area Chart
             with t1:
-                fig_area = px.area(
-                filtered_sector_df,
-                x='Year',
-                y=selected_gas_tab2_pie,
-                color='GREENHOUSE GAS SOURCE AND SINK CATEGORIES',
-                title=f'{selected_gas_tab2_pie} Emissions by Sector Over Time',
-                labels={'value': 'Emissions (kt)'}
-            )
                 st.plotly_chart(fig_area, use_container_width=True, key='area chart')
 
             #Line chart
             with t2:
-                fig_line = px.line(
-                filtered_sector_df,
-                x='Year',
-                y=selected_gas_tab2_pie,
-                color='GREENHOUSE GAS SOURCE AND SINK CATEGORIES',
-                title=f'{selected_gas_tab2_pie} Emissions by Sector Over Time',
-                labels={'value': 'Emissions (kt)'}
-            )
                 st.plotly_chart(fig_line, use_container_width=True, key='line_chart')
 
             # Download view
             with table_tab3:
                 time_series_data = filtered_sector_df[['Year', 'GREENHOUSE GAS SOURCE AND SINK CATEGORIES', selected_gas_tab2_pie]]
                 st.dataframe(time_series_data)
-                csv = time_series_data.to_csv(index=False)
+                csv = to_csv_bytes(time_series_data)
                 st.download_button(
                     label="Download data as CSV",
                     data=csv,
@@ -196,12 +306,9 @@ def render_sector_distribution_page(sidebar_data):
             if selected_hierarchy == 'Sectors':
                 st.markdown("### Sector-Level Policies")
                 if selected_country_folder in policy_data and 'Sectors' in policy_data[selected_country_folder]:
-                    for sector, details in policy_data[selected_country_folder]['Sectors'].items():
+                    for sector in policy_data[selected_country_folder]['Sectors']:
                         with st.expander(f"**{sector}**"):
-                            st.write(details['description'])
-                            st.markdown("##### Key Policies:")
-                            for policy in details['policies']:
-                                st.markdown(f"- {policy}")
+                            st.markdown(POLICY_MARKDOWN[(selected_country_folder, 'Sectors', sector)])
                 else:
                     st.write(f"No sector-level policy data available for {selected_country_folder}.")
 
@@ -209,12 +316,9 @@ def render_sector_distribution_page(sidebar_data):
                 # Subsector display 
                 st.markdown("### Subsector-Level Policies")
                 if selected_country_folder in policy_data and 'Subsectors' in policy_data[selected_country_folder]:
-                    for subsector, details in policy_data[selected_country_folder]['Subsectors'].items():
+                    for subsector in policy_data[selected_country_folder]['Subsectors']:
                         with st.expander(f"**{subsector}**"):
-                            st.write(details['description'])
-                            st.markdown("##### Key Policies:")
-                            for policy in details['policies']:
-                                st.markdown(f"- {policy}")
+                            st.markdown(POLICY_MARKDOWN[(selected_country_folder, 'Subsectors', subsector)])
                 else:
                     st.write(f"No subsector-level policy data available for {selected_country_folder}.")
             